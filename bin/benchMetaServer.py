@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Load generator for the Metadata Server, used to compare serving modes,
+e.g. metaServer.py under uwsgi and metaServerAsync.py:
+
+    benchMetaServer.py -n 10000 -c 1000 \
+        http://localhost:5000/api/meta/v1/db/S12_sdss/tables/
+
+It opens `concurrency` keep-alive connections and sends `requests`
+GET requests in total, then prints the throughput and latency
+percentiles.
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, request, counter, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            start = time.time()
+            writer.write(request)
+            try:
+                status = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors.append(None)
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.time() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("url")
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--gzip", action="store_true",
+                        help="Accept gzip-encoded responses.")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    path = url.path + ("?" + url.query if url.query else "")
+    request = ("GET %s HTTP/1.1\r\nHost: %s\r\n"
+               "Accept: application/json\r\n%s"
+               "Connection: keep-alive\r\n\r\n" % (
+                   path, url.netloc,
+                   "Accept-Encoding: gzip\r\n" if args.gzip else "")
+               ).encode("latin-1")
+
+    counter = [args.requests]
+    latencies = []
+    errors = []
+    loop = asyncio.get_event_loop()
+    start = time.time()
+    loop.run_until_complete(asyncio.gather(*[
+        _client(url.hostname, url.port or 80, request, counter, latencies,
+                errors)
+        for _ in range(args.concurrency)]))
+    elapsed = time.time() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1,
+                             int(p / 100.0 * len(latencies)))] * 1000
+
+    print("%d requests in %.2f s: %.1f requests/s, %d errors" % (
+        len(latencies), elapsed, len(latencies) / elapsed, len(errors)))
+    if latencies:
+        print("latency (ms): p50 %.1f  p90 %.1f  p99 %.1f  max %.1f" % (
+            percentile(50), percentile(90), percentile(99),
+            latencies[-1] * 1000))
+
+
+if __name__ == '__main__':
+    main()
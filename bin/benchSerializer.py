@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the serialization of table listings, comparing the
+marshmallow schemas of api_model with the precompiled serializers
+used by the API:
+
+    benchSerializer.py --tables 400 --columns 200
+
+A schema of synthetic tables is serialized as for a /tables/ request,
+and the throughput is printed in columns per second for both paths,
+after checking that they produce the same data.
+"""
+
+import argparse
+import time
+
+from flask import Flask, request
+
+from lsst.dax.metaserv.api_v1 import meta_api_v1
+from lsst.dax.metaserv.api_model import DatabaseTable, fast_serializer
+from lsst.dax.metaserv.column_store import ColumnStore
+from lsst.dax.metaserv.snapshot import Database, Schema, Table
+
+
+def make_database(n_tables, n_columns):
+    store = ColumnStore()
+    tables = []
+    for table_id in range(1, n_tables + 1):
+        for ordinal in range(n_columns):
+            store.append(table_id * n_columns + ordinal, table_id,
+                         "column_%d" % ordinal,
+                         "Description of column %d." % ordinal, ordinal,
+                         "pos.eq.ra;meta.main", "deg", "double", True, None)
+        tables.append(Table(table_id, 1, "Table_%d" % table_id,
+                            "Description of table %d." % table_id,
+                            store.table_columns(table_id)))
+    schema = Schema(1, 1, "schema", "", True, tuple(tables), None)
+    return Database(1, "db", "", "localhost", 3306, (schema,), schema, None)
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tables", type=int, default=400)
+    parser.add_argument("--columns", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.register_blueprint(meta_api_v1, url_prefix="/api/meta/v1")
+    database = make_database(args.tables, args.columns)
+    tables = database.default_schema.tables
+    n_columns = args.tables * args.columns
+
+    with app.test_request_context("/api/meta/v1/db/1/tables/"):
+        request.database = database
+        expected, marshmallow_time = timed(
+            lambda: DatabaseTable(many=True).dump(tables).data, args.repeat)
+        serializer = fast_serializer(DatabaseTable)
+        result, fast_time = timed(lambda: serializer.dump_many(tables),
+                                  args.repeat)
+    if result != expected:
+        raise SystemExit("The serializers do not produce the same data")
+
+    print("%d tables, %d columns" % (args.tables, n_columns))
+    for name, elapsed in (("marshmallow", marshmallow_time),
+                          ("precompiled", fast_time)):
+        print("%-12s %8.3f s  %12.0f columns/s" % (name, elapsed,
+                                                   n_columns / elapsed))
+    print("speedup      %8.1fx" % (marshmallow_time / fast_time))
+
+
+if __name__ == '__main__':
+    main()
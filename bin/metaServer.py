@@ -23,6 +23,13 @@
 
 """
 This is RESTful LSST Metadata Server. It handles /api/meta.
+
+The connection pool of the metaserv database is configured with the
+following optional keys of the webserv section of the configuration
+file: dax.metaserv.db.pool_size, dax.metaserv.db.max_overflow,
+dax.metaserv.db.pool_timeout (seconds), dax.metaserv.db.pool_recycle
+(seconds, default 3600) and dax.metaserv.db.pool_pre_ping (default
+true).
 """
 
 from flask import Flask, request
@@ -48,11 +55,45 @@ with open(os.path.expanduser(defaults_file)) as cfg:
     metaserv_parser.read_file(cfg, defaults_file)
 
 database_config = dict(metaserv_parser.items("webserv"))
+app.config.update(database_config)
 meta_db_url = database_config.get("dax.metaserv.db.url")
 if "pymysql" not in meta_db_url:
     # FIXME: Using pymysql to bypass the SSL_CTX_set_tmp_dh error
     meta_db_url = meta_db_url.replace("mysql", "mysql+pymysql")
-app.config["default_engine"] = create_engine(meta_db_url)
+
+
+def _boolean(value):
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def engine_options(config):
+    """Return the create_engine() pool options set in `config`."""
+    options = dict(pool_recycle=3600, pool_pre_ping=True)
+    for key, convert in (("pool_size", int),
+                         ("max_overflow", int),
+                         ("pool_timeout", float),
+                         ("pool_recycle", int),
+                         ("pool_pre_ping", _boolean)):
+        value = config.get("dax.metaserv.db." + key)
+        if value is not None:
+            options[key] = convert(value)
+    return options
+
+
+def init_engine():
+    app.config["default_engine"] = create_engine(
+        meta_db_url, **engine_options(database_config))
+
+
+# Under uwsgi, the application is loaded before the workers are forked:
+# create the engine in each worker, so that workers never share
+# connections and pools can be sized per worker.
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    init_engine()
+else:
+    postfork(init_engine)
 
 
 @app.route('/')
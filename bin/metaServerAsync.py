@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Asynchronous mode of the RESTful LSST Metadata Server. It serves the
+same routes as metaServer.py through the ASGI interface, e.g. with:
+
+    uvicorn --app-dir bin metaServerAsync:application
+
+or when run directly, if uvicorn is installed. The number of threads
+running requests is set with the dax.metaserv.async.workers key of the
+webserv config section (default 8).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from metaServer import app  # noqa: E402
+
+from lsst.dax.metaserv.asgi import AsyncMetaServer  # noqa: E402
+
+application = AsyncMetaServer(
+    app, max_workers=int(app.config.get("dax.metaserv.async.workers", 8)))
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(application,
+                host=app.config.get("dax.webserv.host", "0.0.0.0"),
+                port=int(app.config.get("dax.webserv.port", "5000")))
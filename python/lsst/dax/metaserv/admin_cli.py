@@ -30,13 +30,24 @@ information into the LSST Metadata Server.
 
 import logging as log
 import click
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
 import os
+import time
+from datetime import datetime
+from itertools import islice
 
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import sessionmaker
 from lsst.db.exception import produceExceptionClass
-from .schema_utils import parse_schema
+from .schema_utils import parse_schema_cached, iter_schema_cached, \
+    compare_schema
+from .schema_diff import COLUMN_FIELDS, column_values, diff_schema
 from .model import MSUser, MSRepo, MSDatabase, MSDatabaseSchema, \
-    MSDatabaseTable, MSDatabaseColumn
+    MSDatabaseTable, MSDatabaseColumn, MSTapExport, bump_generation, \
+    tap_schema_metadata
+from .snapshot import load_snapshot
+from . import tap_schema as tap
 
 MetaBException = produceExceptionClass('MetaBException', [
     (3005, "BAD_CMD",           "Bad command, see HELP for details."),
@@ -69,10 +80,16 @@ pass_config = click.make_pass_decorator(CliConfig)
               type=click.Path())
 @click.option('--verbose', '-v', is_flag=True,
               help='Enables verbose mode.')
+@click.option('schema_cache', '--schema-cache', envvar='MS_SCHEMA_CACHE',
+              default=os.path.expanduser("~/.lsst/schema_cache"),
+              help='Directory caching parsed schema files, '
+                   'empty to disable.',
+              type=click.Path(file_okay=False))
 @click.pass_context
-def cli(ctx, config, verbose):
+def cli(ctx, config, verbose, schema_cache):
     ctx.obj = CliConfig(config)
     ctx.obj.verbose = verbose
+    ctx.obj.schema_cache = schema_cache or None
     ctx.obj.Session = sessionmaker(ctx.obj.engine)
     ctx.obj.log = log.getLogger("lsst.metaserv.admin")
 
@@ -85,8 +102,18 @@ def init_db(config):
 
 
 def _init_db(config):
-    from .model import Base
-    Base.metadata.create_all(config.engine, checkfirst=True)
+    from .model import init_db
+    init_db(config.engine)
+
+
+@cli.command("upgrade-db")
+@pass_config
+def upgrade_db(config):
+    """Create the tables and indexes missing from an existing
+    database."""
+    from .model import upgrade_db
+    for index_name in upgrade_db(config.engine):
+        click.echo("Created index %s" % index_name)
 
 
 @cli.command("reinit-db")
@@ -99,7 +126,7 @@ def reinit_db(config):
 
 
 @cli.command("add-db")
-@click.argument("schema_file")
+@click.argument("schema_file", type=click.Path(exists=True, dir_okay=False))
 @click.argument("db_name")
 @click.argument("host")
 @click.argument("port")
@@ -110,10 +137,12 @@ def reinit_db(config):
 @click.argument("lsst_level", required=False)
 @click.argument("data_release", required=False)
 @click.argument("target_engine", required=False)
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000,
+              show_default=True, help="Number of rows per INSERT statement.")
 @pass_config
 def add_db(config, schema_file, db_name, host, port, schema_name,
            schema_version, schema_description, owner, lsst_level, data_release,
-           target_engine=None):
+           target_engine=None, batch_size=1000):
     """Add a database.
 
     :param schema_file: ascii file containing schema with
@@ -142,15 +171,37 @@ def add_db(config, schema_file, db_name, host, port, schema_name,
     check that metadata will be consistent with what's loaded
     in the target_engine's database.
 
+    :param batch_size: Number of table or column rows inserted per
+    statement.
+
     """
+    return _add_db(config, schema_file, db_name, host, port, schema_name,
+                   schema_version, schema_description, owner, lsst_level,
+                   data_release, target_engine, batch_size)
+
 
-    # Parse the ascii schema file
-    parsed_schema = parse_schema(schema_file)
+def _add_db(config, schema_file, db_name, host, port, schema_name,
+            schema_version, schema_description, owner, lsst_level=None,
+            data_release=None, target_engine=None, batch_size=1000,
+            parsed_schema=None):
+    """Implementation of add-db. If `parsed_schema` is given, the
+    schema file is not parsed again."""
 
     if target_engine:
+        if isinstance(target_engine, str):
+            from sqlalchemy import create_engine
+            target_engine = create_engine(target_engine)
+        # Parse the ascii schema file
+        if parsed_schema is None:
+            parsed_schema = parse_schema_cached(schema_file,
+                                                config.schema_cache)
         _check_schema_consistency(config, db_name, schema_name, parsed_schema,
                                   schema_version, schema_description,
                                   target_engine)
+    elif parsed_schema is None:
+        # Stream tables from the ascii schema file, or from the cache,
+        # into the inserts
+        parsed_schema = iter_schema_cached(schema_file, config.schema_cache)
 
     # Now, we will be talking to the metaserv database, so change
     # connection as needed
@@ -167,8 +218,13 @@ def add_db(config, schema_file, db_name, host, port, schema_name,
 
         db = ops.add_database(session, repo, db_name, host, port)
         schema = ops.add_schema(session, db, schema_name)
-        ops.add_tables_and_columns(session, schema, parsed_schema)
+        start = time.time()
+        rows = ops.add_tables_and_columns(session, schema, parsed_schema,
+                                          batch_size)
         session.commit()
+        elapsed = time.time() - start
+        click.echo("Inserted %d tables and columns in %.2f s (%.0f rows/s)" %
+                   (rows, elapsed, rows / elapsed if elapsed else rows))
     except Exception as e:
         print(e)
         session.rollback()
@@ -178,6 +234,280 @@ def add_db(config, schema_file, db_name, host, port, schema_name,
     return db
 
 
+@cli.command("add-dbs")
+@click.argument("manifest", type=click.File())
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=4,
+              show_default=True,
+              help="Number of schema files parsed and databases ingested "
+                   "concurrently.")
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000,
+              show_default=True, help="Number of rows per INSERT statement.")
+@pass_config
+def add_dbs(config, manifest, jobs, batch_size):
+    """Add several databases listed in a manifest.
+
+    :param manifest: JSON file containing a list of objects, one per
+    database, whose keys are the arguments of add-db: schema_file,
+    db_name, host, port, schema_name, schema_version,
+    schema_description, owner and optionally lsst_level, data_release
+    and target_engine.
+
+    Schema files are parsed in a pool of processes, then the databases
+    are ingested concurrently over the connection pool of the metaserv
+    engine, each in its own transaction. A summary is printed at the
+    end, and the command fails if any database could not be added.
+    """
+    entries = json.load(manifest)
+    schema_files = sorted(set(entry["schema_file"] for entry in entries))
+
+    parsed = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = dict((schema_file,
+                        executor.submit(_timed_parse, schema_file,
+                                        config.schema_cache))
+                       for schema_file in schema_files)
+        for schema_file, future in futures.items():
+            try:
+                parsed[schema_file] = future.result()
+            except Exception as e:
+                parsed[schema_file] = e
+
+    def ingest(entry):
+        result = parsed[entry["schema_file"]]
+        if isinstance(result, Exception):
+            return None, 0.0, result
+        parsed_schema, parse_time = result
+        start = time.time()
+        try:
+            _add_db(config, batch_size=batch_size,
+                    parsed_schema=parsed_schema, **entry)
+        except Exception as e:
+            return parse_time, time.time() - start, e
+        return parse_time, time.time() - start, None
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(ingest, entries))
+
+    failures = 0
+    click.echo("%-32s %10s %10s  %s" % ("database", "parse (s)",
+                                        "ingest (s)", "status"))
+    for entry, (parse_time, ingest_time, error) in zip(entries, results):
+        if error is not None:
+            failures += 1
+        click.echo("%-32s %10s %10.2f  %s" % (
+            entry["db_name"],
+            "-" if parse_time is None else "%.2f" % parse_time,
+            ingest_time,
+            "OK" if error is None else "FAILED: %s" % error))
+    if failures:
+        raise click.ClickException("%d of %d databases could not be added" %
+                                   (failures, len(entries)))
+
+
+def _timed_parse(schema_file, cache_dir=None):
+    start = time.time()
+    parsed_schema = parse_schema_cached(schema_file, cache_dir)
+    return parsed_schema, time.time() - start
+
+
+@cli.command("update-db")
+@click.argument("schema_file", type=click.Path(exists=True, dir_okay=False))
+@click.argument("db_name")
+@click.argument("schema_name", required=False)
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000,
+              show_default=True, help="Number of rows per statement.")
+@pass_config
+def update_db(config, schema_file, db_name, schema_name=None,
+              batch_size=1000):
+    """Update the tables and columns of a database.
+
+    :param schema_file: ascii file containing the new schema with
+    description.
+
+    :param db_name: database name
+
+    :param schema_name: name of the schema to update. If not given,
+    the default schema of the database is updated.
+
+    Only the tables and columns that changed are inserted, updated or
+    deleted, in a single transaction.
+    """
+    parsed_schema = parse_schema_cached(schema_file, config.schema_cache)
+    session = config.Session()
+    try:
+        db = session.query(MSDatabase).filter(
+            MSDatabase.name == db_name).scalar()
+        if db is None:
+            raise MetaBException(MetaBException.DB_DOES_NOT_EXIST, db_name)
+        if schema_name is None:
+            schema = db.default_schema.scalar()
+        else:
+            schema = db.schemas.filter(
+                MSDatabaseSchema.name == schema_name).scalar()
+        if schema is None:
+            raise MetaBException(MetaBException.DB_DOES_NOT_EXIST,
+                                 schema_name)
+        diff = Operations.update_tables_and_columns(
+            session, schema, parsed_schema, batch_size)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    click.echo("Tables: %d inserted, %d updated, %d deleted" % (
+        len(diff.insert_tables), len(diff.update_tables),
+        len(diff.delete_tables)))
+    click.echo("Columns: %d inserted, %d updated, %d deleted" % (
+        len(diff.insert_columns), len(diff.update_columns),
+        len(diff.delete_columns)))
+    return diff
+
+
+@cli.command("export-tap-schema")
+@click.argument("target_engine", required=False)
+@click.option("--tap-schema", default="TAP_SCHEMA", show_default=True,
+              help="Database schema of the TAP_SCHEMA tables, empty for "
+                   "the default schema of the connection.")
+@click.option("--full", is_flag=True,
+              help="Rewrite all the schemas, even the unchanged ones.")
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000,
+              show_default=True, help="Number of rows per INSERT statement.")
+@pass_config
+def export_tap_schema(config, target_engine=None, tap_schema="TAP_SCHEMA",
+                      full=False, batch_size=1000):
+    """Export the catalog metadata to TAP_SCHEMA.
+
+    :param target_engine: URL of the database holding TAP_SCHEMA. If
+    not given, TAP_SCHEMA is written to the metaserv database.
+
+    The TAP_SCHEMA tables are created if needed. Only the schemas that
+    changed since the last export to the same TAP_SCHEMA are rewritten,
+    in a single transaction; rows of other schemas, e.g. the
+    description of TAP_SCHEMA itself, are left alone. The keys and
+    key_columns tables are left empty, as foreign keys are not recorded
+    in metaserv.
+    """
+    if target_engine:
+        from sqlalchemy import create_engine
+        target_engine = create_engine(target_engine)
+    else:
+        target_engine = config.engine
+    start = time.time()
+    snapshot = _load_snapshot(config)
+    session = config.Session()
+    try:
+        stale, removed = _export_tap_schema(session, snapshot, target_engine,
+                                            tap_schema or None, full,
+                                            batch_size)
+    finally:
+        session.close()
+    click.echo("Schemas: %d written, %d deleted, %d unchanged in %.2f s" % (
+        len(stale), len(removed),
+        sum(len(db.schemas) for db in snapshot.databases) - len(stale),
+        time.time() - start))
+
+
+@cli.command("export-vosi-tables")
+@click.argument("db_names", nargs=-1)
+@click.option("--output", "-o", default="-", type=click.File("w"),
+              help="Output file, standard output by default.")
+@pass_config
+def export_vosi_tables(config, db_names, output):
+    """Write the VOSI tableset of databases.
+
+    :param db_names: names of the databases, all the databases if none
+    is given.
+    """
+    snapshot = _load_snapshot(config)
+    databases = snapshot.databases
+    if db_names:
+        databases = []
+        for db_name in db_names:
+            database = snapshot.database(db_name)
+            if database is None:
+                raise MetaBException(MetaBException.DB_DOES_NOT_EXIST,
+                                     db_name)
+            databases.append(database)
+    for chunk in tap.vosi_tables(tap.iter_schemas(databases)):
+        output.write(chunk)
+
+
+def _load_snapshot(config):
+    session = config.Session()
+    try:
+        return load_snapshot(session)
+    finally:
+        session.close()
+
+
+def _export_tap_schema(session, snapshot, engine, schema="TAP_SCHEMA",
+                       full=False, batch_size=1000):
+    """Write the schemas of a catalog snapshot which changed since the
+    last export to TAP_SCHEMA, and delete the schemas which no longer
+    exist. Returns the lists of the written schemas and of the names
+    of the deleted ones.
+
+    The versions of the exported schemas are recorded in MSTapExport,
+    through the metaserv `session`, once TAP_SCHEMA is committed: if
+    that fails, the next export rewrites the same schemas again.
+    """
+    metadata = tap_schema_metadata(schema)
+    metadata.create_all(engine, checkfirst=True)
+    tables = dict((table.name, table) for table in metadata.sorted_tables)
+    tap_schemas = tables["schemas"]
+    tap_tables = tables["tables"]
+    tap_columns = tables["columns"]
+
+    # The password is hidden by the repr of URLs
+    target = "%r#%s" % (engine.url, schema or "")
+    exported = dict((row.schema_name, row.version) for row in session.query(
+        MSTapExport.schema_name, MSTapExport.version).filter(
+        MSTapExport.target == target))
+    session.commit()
+    schemas = list(tap.iter_schemas(snapshot.databases))
+    stale, removed = tap.plan_refresh(schemas, exported, full)
+    names = removed + [schema.name for schema in stale]
+
+    with engine.begin() as connection:
+        for batch in _batches(names, batch_size):
+            connection.execute(tap_columns.delete().where(
+                tap_columns.c.table_name.in_(
+                    select([tap_tables.c.table_name]).where(
+                        tap_tables.c.schema_name.in_(batch)))))
+            for table in (tap_tables, tap_schemas):
+                connection.execute(table.delete().where(
+                    table.c.schema_name.in_(batch)))
+
+        for table, rows in (
+                (tap_schemas, (tap.schema_row(schema) for schema in stale)),
+                (tap_tables, (row for schema in stale
+                              for row in tap.table_rows(schema))),
+                (tap_columns, (row for schema in stale
+                               for row in tap.column_rows(schema)))):
+            for batch in _batches(rows, batch_size):
+                connection.execute(table.insert(), batch)
+
+    try:
+        for batch in _batches(names, batch_size):
+            session.query(MSTapExport).filter(
+                MSTapExport.target == target,
+                MSTapExport.schema_name.in_(batch)).delete(
+                synchronize_session=False)
+        export_time = datetime.utcnow()
+        _insert_batches(session, MSTapExport,
+                        (dict(target=target,
+                              schema_name=schema.name,
+                              version=tap.schema_version(schema),
+                              export_time=export_time)
+                         for schema in stale), batch_size)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return stale, removed
+
+
 @cli.command("add-user")
 @click.argument("first_name")
 @click.argument("last_name")
@@ -235,76 +565,172 @@ class Operations:
         return schema
 
     @staticmethod
-    def add_tables_and_columns(session, schema, parsed_schema):
-        for table_name in parsed_schema:
-            table_data = parsed_schema[table_name]
-
-            table = MSDatabaseTable(
-                name=table_name,
-                schema_id=schema.id,
-                description=table_data.get("description", "")
-            )
-            session.add(table)
-            session.flush()
-            columns = table_data["columns"]
-            for col, ord_pos in zip(columns, range(len(columns))):
-                print(col)
-                column = MSDatabaseColumn(
-                    table_id=table.id,
-                    name=col["name"],
-                    description=col.get("description", ""),
-                    ordinal=ord_pos,
-                    ucd=col.get("ucd", ""),
-                    unit=col.get("unit", ""),
-                    nullable=col.get("nullable", True),
-                    datatype=col.get("datatype", ""),
-                    arraysize=col.get("arraysize", ""),
-                )
-                session.add(column)
-            session.flush()
+    def add_tables_and_columns(session, schema, parsed_schema,
+                               batch_size=1000):
+        """Insert the tables and columns of a parsed schema with batched
+        multi-row INSERT statements, and bump the metadata generation.
+
+        `parsed_schema` is either a dict as returned by `parse_schema`,
+        or an iterable of (table_name, table) tuples as returned by
+        `iter_schema`, which is consumed `batch_size` tables at a time.
+        Returns the number of rows inserted."""
+        if hasattr(parsed_schema, "items"):
+            parsed_schema = parsed_schema.items()
+        parsed_schema = iter(parsed_schema)
+        rows = 0
+        while True:
+            tables = list(islice(parsed_schema, batch_size))
+            if not tables:
+                break
+            table_rows = [
+                dict(name=table_name,
+                     schema_id=schema.id,
+                     description=table_data.get("description", ""))
+                for table_name, table_data in tables]
+            rows += _insert_batches(session, MSDatabaseTable, table_rows,
+                                    batch_size)
+
+            # Resolve the ids of the whole batch of tables at once
+            table_ids = dict(session.query(
+                MSDatabaseTable.name, MSDatabaseTable.id).filter(
+                MSDatabaseTable.schema_id == schema.id,
+                MSDatabaseTable.name.in_([row["name"]
+                                          for row in table_rows])))
+
+            column_rows = (
+                dict(column_values(col, ord_pos),
+                     table_id=table_ids[table_name])
+                for table_name, table_data in tables
+                for ord_pos, col in enumerate(table_data.get("columns", [])))
+            rows += _insert_batches(session, MSDatabaseColumn, column_rows,
+                                    batch_size)
+        bump_generation(session)
+        return rows
+
+    @staticmethod
+    def update_tables_and_columns(session, schema, parsed_schema,
+                                  batch_size=1000):
+        """Apply the differences between the stored tables and columns
+        of a schema and a parsed schema, and bump the metadata
+        generation if anything changed. Returns the `SchemaDiff`."""
+        stored_schema = {}
+        for table in session.query(
+                MSDatabaseTable.id, MSDatabaseTable.name,
+                MSDatabaseTable.description).filter(
+                MSDatabaseTable.schema_id == schema.id):
+            stored_schema[table.name] = dict(id=table.id,
+                                             description=table.description,
+                                             columns=[])
+        table_names = dict((table["id"], name)
+                           for name, table in stored_schema.items())
+        column_attributes = [getattr(MSDatabaseColumn, field)
+                             for field in COLUMN_FIELDS]
+        for column in session.query(
+                MSDatabaseColumn.id, MSDatabaseColumn.table_id,
+                *column_attributes).join(
+                MSDatabaseTable,
+                MSDatabaseTable.id == MSDatabaseColumn.table_id).filter(
+                MSDatabaseTable.schema_id == schema.id):
+            values = dict(zip(("id", "table_id") + COLUMN_FIELDS, column))
+            stored_schema[table_names[column.table_id]]["columns"].append(
+                values)
+
+        diff = diff_schema(stored_schema, parsed_schema)
+
+        column_table = MSDatabaseColumn.__table__
+        table_table = MSDatabaseTable.__table__
+        for ids in _batches(diff.delete_columns, batch_size):
+            session.execute(column_table.delete().where(
+                column_table.c.id.in_(ids)))
+        for ids in _batches(diff.delete_tables, batch_size):
+            session.execute(table_table.delete().where(
+                table_table.c.id.in_(ids)))
+        for batch in _batches(diff.update_tables, batch_size):
+            session.execute(table_table.update().where(
+                table_table.c.id == bindparam("_id")).values(
+                description=bindparam("description")),
+                [dict(_id=row["id"], description=row["description"])
+                 for row in batch])
+        # Columns may swap ordinals: move the updated ones out of the
+        # way first, as (table_id, ordinal) is unique.
+        for batch in _batches(diff.update_columns, batch_size):
+            session.execute(column_table.update().where(
+                column_table.c.id == bindparam("_id")).values(
+                ordinal=bindparam("ordinal")),
+                [dict(_id=row["id"], ordinal=-row["id"]) for row in batch])
+        for batch in _batches(diff.update_columns, batch_size):
+            session.execute(column_table.update().where(
+                column_table.c.id == bindparam("_id")).values(
+                dict((field, bindparam(field)) for field in COLUMN_FIELDS)),
+                [dict(((field, row[field]) for field in COLUMN_FIELDS),
+                      _id=row["id"]) for row in batch])
+
+        _insert_batches(session, MSDatabaseTable,
+                        (dict(row, schema_id=schema.id)
+                         for row in diff.insert_tables), batch_size)
+        if diff.insert_columns:
+            table_ids = dict(session.query(
+                MSDatabaseTable.name, MSDatabaseTable.id).filter(
+                MSDatabaseTable.schema_id == schema.id))
+            _insert_batches(session, MSDatabaseColumn,
+                            (dict(values, table_id=table_ids[table_name])
+                             for table_name, values in diff.insert_columns),
+                            batch_size)
+        if any(diff):
+            bump_generation(session)
+        return diff
+
+
+def _batches(items, batch_size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert_batches(session, model, rows, batch_size):
+    """Insert rows, given as dicts, with one executemany statement per
+    batch. Returns the number of rows inserted."""
+    count = 0
+    for batch in _batches(rows, batch_size):
+        session.execute(model.__table__.insert(), batch)
+        count += len(batch)
+    return count
 
 
 def _check_schema_consistency(config, db_name, schema_name, parsed_schema,
                               schema_version, schema_description,
                               target_engine):
-    # Connect to the server that has database that is being added
-    from sqlalchemy.engine.reflection import Inspector
-
-    inspector = Inspector(target_engine)
-
-    if schema_name not in inspector.get_schema_names():
+    # Connect to the server that has database that is being added.
+    # All the columns of the schema are fetched with a single query.
+    from sqlalchemy import text
+
+    found = target_engine.execute(text(
+        "SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA "
+        "WHERE SCHEMA_NAME = :schema"), schema=schema_name).first()
+    if found is None:
         config.log.error("Schema '%s' not found.", db_name)
         raise MetaBException(MetaBException.DB_DOES_NOT_EXIST, db_name)
 
-    db_tables = inspector.get_table_names(schema=schema_name)
-
-    for table_name, parsed_table in parsed_schema.items():
-        # Check parsed tables - we allow other tables in schema
-        if table_name not in db_tables:
-            config.log.error(
-                "Table '%s' not found in db, present in ascii file.",
-                table_name)
-            raise MetaBException(MetaBException.TB_NOT_IN_DB, table_name)
-
-        db_columns = inspector.get_columns(table_name=table_name,
-                                           schema=schema_name)
-        parsed_columns = parsed_table["columns"]
-        if len(parsed_columns) != len(db_columns):
-            config.log.error("Number of columns in db for table %s (%d) "
-                             "differs from number columns in schema (%d)",
-                             table_name, len(db_columns),
-                             len(parsed_columns))
-            raise MetaBException(MetaBException.NOT_MATCHING)
-
-        for column in parsed_columns:
-            column_name = column["name"]
-            if column_name not in db_columns:
-                config.log.error(
-                    "Column '%s.%s' not found in db, "
-                    "but exists in schema DDL",
-                    table_name, column_name)
-                raise MetaBException(MetaBException.COL_NOT_IN_TB,
-                                     column_name, table_name)
+    db_columns = {}
+    rows = target_engine.execute(text(
+        "SELECT TABLE_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS "
+        "WHERE TABLE_SCHEMA = :schema "
+        "ORDER BY TABLE_NAME, ORDINAL_POSITION"), schema=schema_name)
+    for table_name, column_name in rows:
+        db_columns.setdefault(table_name, []).append(column_name)
+
+    mismatches = compare_schema(parsed_schema, db_columns)
+    for kind, message in mismatches:
+        config.log.error(message)
+    if mismatches:
+        raise MetaBException(
+            getattr(MetaBException, mismatches[0][0]),
+            "%d mismatches between schema DDL and db: %s" %
+            (len(mismatches), "; ".join(message
+                                        for _, message in mismatches)))
 
     # Get schema description and version, it is ok if it is missing
     ret = target_engine.execute(
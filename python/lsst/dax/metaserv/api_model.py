@@ -19,29 +19,55 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
+
 from marshmallow import Schema, fields
-from flask import request, url_for
+from flask import current_app, request, url_for
+
+from .serializer import FieldSpec, Serializer
+from .urls import UrlTemplateCache
+
+
+def _build_url(endpoint, **values):
+    return url_for(endpoint, _external=True, **values)
+
+
+def resource_url(endpoint, id_name, id_value, **values):
+    """Return the external URL of an API resource, as
+    `url_for(endpoint, _external=True, **values)` with `id_name` set to
+    `id_value`, from the URL templates of the request's URL root."""
+    environ = request.environ
+    templates = environ.get("metaserv.url_templates")
+    if templates is None:
+        cache = current_app.extensions.get("metaserv_url_templates")
+        if cache is None:
+            cache = current_app.extensions.setdefault(
+                "metaserv_url_templates", UrlTemplateCache(_build_url))
+        templates = environ["metaserv.url_templates"] = cache.get(
+            request.url_root)
+    return templates.url(endpoint, id_name, id_value, **values)
 
 
 def db_url(db):
     db_id = request.view_args.get("db_id", db.id)
     schema_id = request.view_args.get("schema_id", None)
-    return url_for(".database", schema_id=schema_id, db_id=db_id,
-                   _external=True)
+    return resource_url(".database", "db_id", db_id, schema_id=schema_id)
 
 
 def schema_url(schema):
     db_id = request.database.id
-    schema_id = schema.id
-    return url_for(".tables", schema_id=schema_id, db_id=db_id,
-                   _external=True)
+    return resource_url(".tables", "schema_id", schema.id, db_id=db_id)
 
 
 def table_url(table):
     db_id = request.database.id
     schema_id = request.view_args.get("schema_id", None)
-    return url_for(".table", schema_id=schema_id, db_id=db_id,
-                   table_id=table.id, _external=True)
+    if schema_id is None and table.schema_id != getattr(
+            request.database.default_schema, "id", None):
+        # Not in the default schema, e.g. from a batch request
+        schema_id = table.schema_id
+    return resource_url(".table", "table_id", table.id, schema_id=schema_id,
+                        db_id=db_id)
 
 
 class Database(Schema):
@@ -53,8 +79,7 @@ class Database(Schema):
     url = fields.Function(db_url)
     host = fields.String(attribute="conn_host")
     port = fields.Integer(attribute="conn_port")
-    default_schema = fields.Function(
-        lambda obj: obj.default_schema.first().name)
+    default_schema = fields.String(attribute="default_schema.name")
 
 
 class DatabaseSchema(Schema):
@@ -95,6 +120,55 @@ class DatabaseTable(Schema):
     columns = fields.Nested(DatabaseColumn, many=True)
 
 
+#: Maximum number of cached serializers. As field selections come from
+#: requests, the cache is dropped when it is full.
+MAX_SERIALIZERS = 256
+
+_serializers = {}
+
+
+def fast_serializer(schema_class, only=None):
+    """Return a `Serializer` dumping the same data as
+    `schema_class(only=only).dump(obj).data`, compiled on first use.
+
+    Only the field types used by the schemas of this module are
+    supported, and objects are read through attributes.
+    """
+    if only is not None:
+        # Repeated names are ignored, as by marshmallow
+        only = tuple(OrderedDict.fromkeys(only))
+    key = (schema_class, only)
+    serializer = _serializers.get(key)
+    if serializer is not None:
+        return serializer
+    declared = schema_class._declared_fields
+    specs = []
+    for name in only or declared:
+        field = declared[name]
+        key_name = field.dump_to or name
+        attribute = field.attribute or name
+        if isinstance(field, fields.Nested):
+            specs.append(FieldSpec(
+                key_name, attribute, "nested_many" if field.many else
+                "nested", fast_serializer(field.nested, field.only)))
+        elif isinstance(field, fields.Function):
+            specs.append(FieldSpec(key_name, attribute, "function",
+                                   field.serialize_func))
+        elif isinstance(field, fields.Boolean):
+            specs.append(FieldSpec(key_name, attribute, "boolean", None))
+        elif isinstance(field, fields.Integer):
+            specs.append(FieldSpec(key_name, attribute, "integer", None))
+        elif isinstance(field, fields.String):
+            specs.append(FieldSpec(key_name, attribute, "string", None))
+        else:
+            raise TypeError("Unsupported field %s.%s" %
+                            (schema_class.__name__, name))
+    serializer = Serializer(schema_class.__name__, specs)
+    if len(_serializers) >= MAX_SERIALIZERS:
+        _serializers.clear()
+    return _serializers.setdefault(key, serializer)
+
+
 # if __name__ == '__main__':
 #     class Mock(object):
 #         pass
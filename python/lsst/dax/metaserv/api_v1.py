@@ -30,17 +30,32 @@ supported formats: json and html.
 import os
 from collections import OrderedDict
 import base64
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+import hashlib
 import json
+import tempfile
+import threading
+import time
 
 from flask import Blueprint, request, current_app, g, jsonify
-from flask import make_response, render_template
+from flask import abort, make_response, render_template, Response
+from flask import has_request_context, stream_with_context
+from flask.json import dumps as json_dumps
+from sqlalchemy import event
 
 import re
-from sqlalchemy import or_, and_
 
 import lsst.log as log
 
-from .model import session_maker, MSDatabase, MSDatabaseSchema, MSDatabaseTable
+from .model import session_maker
+from .snapshot import SnapshotCache
+from .response_cache import ResponseCache, make_entry
+from .search import ColumnSearchIndex, SEARCH_FIELDS
+from .facets import FacetIndex, FACET_FIELDS
+from .metrics import CONTENT_TYPE, RequestMetrics, RequestStats
 from .api_model import *
 
 SAFE_NAME_REGEX = r'[A-Za-z_$][A-Za-z0-9_$]*$'
@@ -58,10 +73,329 @@ log.configure(os.path.join(config_path, "log.properties"))
 
 
 def Session():
-    db = getattr(g, '_Session', None)
-    if db is None:
-        db = g._session = session_maker(current_app.config["default_engine"])
-    return db()
+    """Return the session of the current request. Sessions are
+    read-only and in autocommit mode, so that connections go back to
+    the pool after each query, and are closed on request teardown."""
+    session = getattr(g, '_session', None)
+    if session is None:
+        factory = current_app.extensions.get("metaserv_session_factory")
+        if factory is None:
+            engine = current_app.config["default_engine"]
+            _instrument_engine(engine)
+            factory = current_app.extensions.setdefault(
+                "metaserv_session_factory",
+                session_maker(engine, autocommit=True))
+        session = g._session = factory()
+    return session
+
+
+@meta_api_v1.teardown_request
+def close_session(exception=None):
+    session = g.pop('_session', None)
+    if session is not None:
+        session.close()
+
+
+def _instrument_engine(engine):
+    """Count the SQL queries run on an engine, and their duration, in
+    the stats of the current request."""
+    if not event.contains(engine, "before_cursor_execute",
+                          _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute",
+                     _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    context._metaserv_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    stats = _request_stats()
+    if stats is not None:
+        stats.sql_queries += 1
+        stats.sql_time += time.perf_counter() - context._metaserv_start
+
+
+def _metrics():
+    metrics = current_app.extensions.get("metaserv_metrics")
+    if metrics is None:
+        metrics = current_app.extensions.setdefault("metaserv_metrics",
+                                                    RequestMetrics())
+    return metrics
+
+
+def _request_stats():
+    """Return the `RequestStats` of the current request, None outside
+    of requests."""
+    if not has_request_context():
+        return None
+    return g.get("_metrics_stats")
+
+
+@contextmanager
+def _timed(stage, stats=None):
+    """Add the time spent in a block to the `stage` attribute of the
+    request stats, e.g. "serialize_time".
+
+    Streamed responses are generated after the request stats have been
+    taken from `g`, so their generators pass the stats they captured.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is None:
+            stats = _request_stats()
+        if stats is not None:
+            setattr(stats, stage,
+                    getattr(stats, stage) + time.perf_counter() - start)
+
+
+def _jsonify(*args, **kwargs):
+    with _timed("encode_time"):
+        return jsonify(*args, **kwargs)
+
+
+def _timed_dumps(dump, objs):
+    """Return an iterator serializing objects one at a time with `dump`,
+    timing each."""
+    stats = _request_stats()
+
+    def generate():
+        for obj in objs:
+            with _timed("serialize_time", stats):
+                data = dump(obj)
+            yield data
+    return generate()
+
+
+def Snapshot():
+    """Return the metadata snapshot of this process, reloading it
+    first if the metadata generation has changed."""
+    cache = current_app.extensions.get("metaserv_snapshot")
+    if cache is None:
+        interval = float(current_app.config.get(
+            "dax.metaserv.snapshot.check_interval", 5.0))
+        cache = current_app.extensions.setdefault(
+            "metaserv_snapshot", SnapshotCache(interval))
+    return cache.get(Session)
+
+
+_index_lock = threading.Lock()
+
+
+def _snapshot_index(snapshot, index_class):
+    """Return an index of a snapshot, building it on first use. The
+    index is built by calling `index_class` with the databases."""
+    key = "metaserv_" + index_class.__name__
+    indexed = current_app.extensions.get(key)
+    if indexed is None or indexed[0] is not snapshot:
+        with _index_lock:
+            indexed = current_app.extensions.get(key)
+            if indexed is None or indexed[0] is not snapshot:
+                indexed = (snapshot, index_class(snapshot.databases))
+                current_app.extensions[key] = indexed
+    return indexed[1]
+
+
+def _response_cache():
+    cache = current_app.extensions.get("metaserv_response_cache")
+    if cache is None:
+        max_bytes = int(current_app.config.get(
+            "dax.metaserv.response_cache.max_bytes", 64 * 1024 * 1024))
+        cache = current_app.extensions.setdefault(
+            "metaserv_response_cache", ResponseCache(max_bytes))
+    return cache
+
+
+def _resource_version(snapshot, view_args):
+    """Return the version of the metadata a request depends on, None
+    if the database or schema it refers to does not exist."""
+    db_id = view_args.get("db_id")
+    if db_id is None:
+        return snapshot.version
+    database = snapshot.database(db_id)
+    if database is None:
+        return None
+    if request.endpoint in (meta_api_v1.name + ".database",
+                            meta_api_v1.name + ".table_batch",
+                            meta_api_v1.name + ".facets"):
+        return database.version
+    schema = snapshot.schema(database, view_args.get("schema_id"))
+    return schema.version if schema is not None else None
+
+
+def cached_response(view):
+    """Cache the serialized responses of a view for the current
+    metadata generation, and handle conditional requests.
+
+    Only GET requests are cached. Responses are keyed by route, view
+    arguments, query arguments, host and requested representation.
+    Large bodies are also kept gzip-compressed, and sent as is to
+    clients accepting gzip.
+
+    The ETag of a response is derived from that key and from the
+    version of the database or schema it depends on, so that it can be
+    checked without building the response. Streamed responses get an
+    ETag, but are not cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET":
+            return view(*args, **kwargs)
+        snapshot = Snapshot()
+        version = _resource_version(snapshot, request.view_args)
+        if version is None:
+            return view(*args, **kwargs)
+        key = (request.endpoint,
+               tuple(sorted(request.view_args.items())),
+               tuple(sorted(request.args.items(multi=True))),
+               request.host_url,
+               request.accept_mimetypes.best_match(ACCEPT_TYPES))
+        etag = hashlib.sha1(repr((version, key)).encode("utf-8")).hexdigest()
+        gzip_etag = etag + "-gzip"
+
+        for candidate in (etag, gzip_etag):
+            if request.if_none_match.contains_weak(candidate):
+                return _cache_headers(Response(status=304), candidate,
+                                      snapshot)
+        if_modified_since = request.if_modified_since
+        if if_modified_since and if_modified_since.tzinfo is None:
+            # Werkzeug < 2 returns naive UTC datetimes
+            if_modified_since = if_modified_since.replace(
+                tzinfo=timezone.utc)
+        if not request.if_none_match and snapshot.update_time and \
+                if_modified_since and if_modified_since >= \
+                snapshot.update_time.replace(microsecond=0):
+            return _cache_headers(Response(status=304), etag, snapshot)
+
+        cache = _response_cache()
+        cache.validate(snapshot.generation)
+        entry = cache.get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if response.is_streamed:
+                return _cache_headers(response, etag, snapshot)
+            gzip_min_size = int(current_app.config.get(
+                "dax.metaserv.response_cache.gzip_min_size", 1024))
+            entry = make_entry(response.get_data(), response.mimetype,
+                               gzip_min_size if gzip_min_size > 0 else None)
+            if cache.max_bytes > 0:
+                cache.put(key, entry)
+        if entry.gzip_body is not None and "gzip" in request.accept_encodings:
+            response = Response(entry.gzip_body, mimetype=entry.mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+            etag = gzip_etag
+        else:
+            response = Response(entry.body, mimetype=entry.mimetype)
+        return _cache_headers(response, etag, snapshot)
+    return wrapper
+
+
+def _cache_headers(response, etag, snapshot):
+    response.set_etag(etag)
+    if snapshot.update_time:
+        response.last_modified = snapshot.update_time
+    response.cache_control.public = True
+    response.cache_control.max_age = int(current_app.config.get(
+        "dax.metaserv.cache_control.max_age", 60))
+    response.vary.add("Accept")
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _json_stream(before, items, after, buffer_size=65536):
+    """Return a streamed JSON response made of `before`, a JSON array
+    of `items` and `after`.
+
+    Items are serialized one at a time as they are consumed, and sent
+    in chunks of about `buffer_size` bytes, the first chunk being sent
+    right away.
+    """
+    stats = _request_stats()
+
+    def generate():
+        yield before + "["
+        chunk = []
+        size = 0
+        separator = ""
+        for item in items:
+            with _timed("encode_time", stats):
+                data = separator + json_dumps(item)
+            separator = ","
+            chunk.append(data)
+            size += len(data)
+            if size >= buffer_size:
+                yield "".join(chunk)
+                chunk = []
+                size = 0
+        chunk.append("]" + after)
+        yield "".join(chunk)
+    return Response(stream_with_context(generate()),
+                    mimetype="application/json")
+
+
+def _database_and_schema(snapshot, db_id, schema_id=None):
+    """Resolve a database and one of its schemas. If `schema_id` is
+    None, the default schema is used.
+    """
+    database = snapshot.database(db_id)
+    if database is None:
+        abort(404)
+    schema = snapshot.schema(database, schema_id)
+    if schema is None:
+        abort(404)
+    return database, schema
+
+
+def _int_arg(name):
+    """Return a non-negative integer query parameter, None if it was
+    not supplied."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400)
+    if value < 0:
+        abort(400)
+    return value
+
+
+def _fields_arg(schema_class):
+    """Return the field names requested with the `fields` query
+    parameter, None if it was not supplied."""
+    value = request.args.get("fields")
+    if not value:
+        return None
+    only = tuple(name.strip() for name in value.split(",") if name.strip())
+    if not only or set(only) - set(schema_class._declared_fields):
+        abort(400)
+    return only
+
+
+def _column_filter(snapshot):
+    """Return the set of ids of the columns selected by the `ucd` and
+    `unit` query parameters, None if neither was supplied."""
+    column_ids = None
+    for field in FACET_FIELDS:
+        pattern = request.args.get(field)
+        if pattern:
+            ids = _snapshot_index(snapshot, FacetIndex).column_ids(
+                field, pattern)
+            column_ids = ids if column_ids is None else column_ids & ids
+    return column_ids
+
+
+def _filter_columns(table, column_ids):
+    return table._replace(columns=[column for column in table.columns
+                                   if column.id in column_ids])
 
 
 # log the user name of the auth token
@@ -87,16 +421,126 @@ def check_auth():
             log.info("unexpected error in JWT")
 
 
+@meta_api_v1.before_request
+def start_metrics():
+    g._metrics_stats = RequestStats()
+    g._metrics_start = time.perf_counter()
+    _start_profile()
+
+
+@meta_api_v1.after_request
+def record_metrics(response):
+    """Record the metrics of a request once its response is sent, so
+    that the time spent streaming a response is included."""
+    stats = g.pop("_metrics_stats", None)
+    if stats is None:
+        return response
+    start = g.pop("_metrics_start")
+    _stop_profile(response)
+    if response.is_streamed:
+        response.response = _counted_chunks(response.response, stats)
+    else:
+        stats.response_size = response.calculate_content_length() or 0
+    metrics = _metrics()
+    endpoint = request.endpoint
+    method = request.method
+    status = str(response.status_code)
+
+    def record():
+        metrics.record(endpoint, method, status,
+                       time.perf_counter() - start, stats)
+    response.call_on_close(record)
+    return response
+
+
+def _counted_chunks(chunks, stats):
+    for chunk in chunks:
+        stats.response_size += len(chunk.encode("utf-8")
+                                   if isinstance(chunk, str) else chunk)
+        yield chunk
+
+
+def _start_profile():
+    """Profile the request with cProfile if profiling is enabled, by
+    setting dax.metaserv.profile.dir, and the request has an
+    X-Metaserv-Profile header. If dax.metaserv.profile.token is set,
+    the header must have that value."""
+    profile_dir = current_app.config.get("dax.metaserv.profile.dir")
+    header = request.headers.get("X-Metaserv-Profile")
+    if not profile_dir or not header:
+        return
+    token = current_app.config.get("dax.metaserv.profile.token")
+    if token and header != token:
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another request of this process is being profiled
+        log.info("Profiler busy, not profiling {}".format(request.path))
+        return
+    g._profiler = profiler
+
+
+def _stop_profile(response):
+    """Stop the profiler of the request, if any, and dump its stats in
+    the profile directory. The name of the file is returned in the
+    X-Metaserv-Profile-File header. The profile of a streamed response
+    stops before its body is sent."""
+    profiler = g.pop("_profiler", None)
+    if profiler is None:
+        return
+    profiler.disable()
+    profile_dir = current_app.config["dax.metaserv.profile.dir"]
+    prefix = "%s-%s-" % (request.endpoint,
+                         datetime.utcnow().strftime("%Y%m%dT%H%M%S"))
+    fd, path = tempfile.mkstemp(suffix=".prof", prefix=prefix,
+                                dir=profile_dir)
+    os.close(fd)
+    profiler.dump_stats(path)
+    response.headers["X-Metaserv-Profile-File"] = os.path.basename(path)
+
+
+@meta_api_v1.route('/metrics', methods=['GET'])
+def metrics():
+    """Show the metrics of this server process, in the Prometheus text
+    format.
+
+    Requests are counted per endpoint, method and status, and the
+    following histograms are kept per endpoint: request duration,
+    number and duration of SQL queries, time spent serializing
+    records and encoding JSON, and response size.
+
+    **Example request**
+    .. code-block:: http
+        GET /metrics HTTP/1.1
+
+    **Example response**
+    .. code-block:: http
+       HTTP/1.1 200 OK
+       Content-Type: text/plain; version=0.0.4; charset=utf-8
+
+        # HELP metaserv_requests_total Requests handled.
+        # TYPE metaserv_requests_total counter
+        metaserv_requests_total{endpoint="api_meta_v1.tables",...} 42
+        ...
+
+    :statuscode 200: No Error
+    """
+    return Response(_metrics().render(), content_type=CONTENT_TYPE)
+
+
 @meta_api_v1.route('/')
 def index():
     fmt = request.accept_mimetypes.best_match(ACCEPT_TYPES)
     if fmt == "text/html":
         return make_response(render_template("api_metadata_v1.html"))
     else:
-        return jsonify({"Metadata v1. Links": "/db"})
+        return _jsonify({"Metadata v1. Links": "/db"})
 
 
 @meta_api_v1.route('/db/', methods=['GET'])
+@cached_response
 def databases():
     """List databases known to this service.
 
@@ -128,14 +572,14 @@ def databases():
 
     :statuscode 200: No Error
     """
-    db = Session()
-    db_schema = Database(many=True)
-    databases = db.query(MSDatabase).all()
-    results = db_schema.dump(databases)
-    return jsonify({"results": results.data})
+    databases = Snapshot().databases
+    with _timed("serialize_time"):
+        results = fast_serializer(Database).dump_many(databases)
+    return _jsonify({"results": results})
 
 
 @meta_api_v1.route('/db/<string:db_id>/', methods=['GET'])
+@cached_response
 def database(db_id):
     """Show information about a particular database.
 
@@ -177,28 +621,32 @@ def database(db_id):
     :statuscode 200: No Error
     :statuscode 404: No database with that id found.
     """
-    session = Session()
-    database = session.query(MSDatabase).filter(
-        or_(MSDatabase.id == db_id, MSDatabase.name == db_id)).first()
+    database = Snapshot().database(db_id)
+    if database is None:
+        abort(404)
     request.database = database
-    db_schema = Database()
-    schemas_schema = DatabaseSchema(many=True)
-    db_result = db_schema.dump(database)
-    schemas_result = schemas_schema.dump(database.schemas)
-    response = OrderedDict(db_result.data)
-    response["schemas"] = schemas_result.data
-    return jsonify(response)
+    with _timed("serialize_time"):
+        response = fast_serializer(Database).dump(database)
+        response["schemas"] = fast_serializer(DatabaseSchema).dump_many(
+            database.schemas)
+    return _jsonify(response)
 
 
 @meta_api_v1.route('/db/<string:db_id>/<string:schema_id>/tables/',
-                       methods=['GET'])
+                   methods=['GET'])
 @meta_api_v1.route('/db/<string:db_id>/tables/', methods=['GET'])
+@cached_response
 def tables(db_id, schema_id=None):
     """Show tables for the databases's default schema.
 
     This method returns a list of the tables and views for the default
-    database schema. If no parameter is supplied, this will only return
-    a simple list of the object names. If a query parameter
+    database schema, including their columns. The `fields` query
+    parameter restricts the output to some of the table fields, e.g.
+    `fields=name` only returns the table names, and the `limit` and
+    `offset` parameters page through the tables. With `stream=true`,
+    the tables are serialized and sent one by one, so that large
+    schemas are neither held in memory as a whole nor delayed until
+    fully serialized.
 
     **Example request 1**
     .. code-block:: http
@@ -268,42 +716,64 @@ def tables(db_id, schema_id=None):
 
     :param db_id: Database identifier
     :param schema_id: Name or ID of the schema. If none, use default.
+    :query fields: Comma-separated list of the table fields to return,
+       among `name`, `id`, `url`, `description` and `columns`.
+    :query limit: Maximum number of tables to return.
+    :query offset: Number of tables to skip. If `limit` or `offset` is
+       supplied, the total number of tables is returned as `total`.
+    :query ucd: Only return the columns with that UCD word, or with a
+       word in that branch of the UCD hierarchy if it ends with `.*`
+       (e.g. `pos.eq.*`), and the tables having such columns.
+    :query unit: Only return the columns with that unit, and the tables
+       having such columns.
+    :query stream: `true` to stream the response.
 
     :statuscode 200: No Error
+    :statuscode 400: Invalid query parameter.
     :statuscode 404: No database with that id found.
     """
-    session = Session()
-    # This sends out 3 queries. It could be optimized into one large
-    # Join query.
-    database = session.query(MSDatabase).filter(
-        or_(MSDatabase.id == db_id, MSDatabase.name == db_id)).first()
+    snapshot = Snapshot()
+    database, schema = _database_and_schema(snapshot, db_id, schema_id)
     request.database = database
+    only = _fields_arg(DatabaseTable)
+    limit = _int_arg("limit")
+    offset = _int_arg("offset")
 
-    if schema_id is not None:
-        schema = database.schemas.filter(or_(
-            MSDatabaseSchema.id == schema_id,
-            MSDatabaseSchema.name == schema_id
-        )).scalar()
-    else:
-        schema = database.default_schema.scalar()
+    tables = schema.tables
+    column_ids = _column_filter(snapshot)
+    if column_ids is not None:
+        tables = [_filter_columns(table, column_ids) for table in tables]
+        tables = [table for table in tables if table.columns]
+    total = len(tables)
+    if offset is not None or limit is not None:
+        start = offset or 0
+        stop = start + limit if limit is not None else None
+        tables = tables[start:stop]
 
-    schema_schema = DatabaseSchema()
-    schema_result = schema_schema.dump(schema)
-    tables = session.query(MSDatabaseTable).filter(
-        MSDatabaseTable.schema_id == schema.id).all()
-    table_schema = DatabaseTable(many=True)
-    tables_result = table_schema.dump(tables)
-    return jsonify({"results": {
-        "schema": schema_result.data,
-        "tables": tables_result.data}
-    })
+    with _timed("serialize_time"):
+        schema_result = fast_serializer(DatabaseSchema).dump(schema)
+    table_serializer = fast_serializer(DatabaseTable, only)
+    if request.args.get("stream", "false").lower() == "true":
+        after = "}}"
+        if offset is not None or limit is not None:
+            after = ',"total":%d}}' % total
+        return _json_stream(
+            '{"results":{"schema":%s,"tables":' % json_dumps(schema_result),
+            _timed_dumps(table_serializer.dump, tables), after)
+    with _timed("serialize_time"):
+        results = OrderedDict([("schema", schema_result),
+                               ("tables", table_serializer.dump_many(tables))])
+    if offset is not None or limit is not None:
+        results["total"] = total
+    return _jsonify({"results": results})
 
 
 @meta_api_v1.route('/db/<string:db_id>/<string:schema_id>/tables/'
-                       '<table_id>/',
-                       methods=['GET'])
+                   '<table_id>/',
+                   methods=['GET'])
 @meta_api_v1.route('/db/<string:db_id>/tables/<table_id>/',
-                       methods=['GET'])
+                   methods=['GET'])
+@cached_response
 def table(db_id, table_id, schema_id=None):
     """Show information about the table.
 
@@ -359,32 +829,230 @@ def table(db_id, table_id, schema_id=None):
     :query description: If supplied, must be one of the following:
        `content`
     in the response, including the columns of the tables.
+    :query ucd: Only return the columns with that UCD word, or in that
+       branch of the UCD hierarchy if it ends with `.*`.
+    :query unit: Only return the columns with that unit.
 
     :statuscode 200: No Error
     :statuscode 404: No database with that id found.
     """
-    session = Session()
-    # This sends out 3 queries. It could be optimized into one large
-    # Join query.
-    database = session.query(MSDatabase).filter(
-        or_(MSDatabase.id == db_id, MSDatabase.name == db_id)).scalar()
+    snapshot = Snapshot()
+    database, schema = _database_and_schema(snapshot, db_id, schema_id)
     request.database = database
-    if schema_id is not None:
-        schema = database.schemas.filter(or_(
-            MSDatabaseSchema.id == schema_id,
-            MSDatabaseSchema.name == schema_id
-        )).scalar()
+
+    table = snapshot.table(schema, table_id)
+    if table is None:
+        abort(404)
+    column_ids = _column_filter(snapshot)
+    if column_ids is not None:
+        table = _filter_columns(table, column_ids)
+
+    with _timed("serialize_time"):
+        result = fast_serializer(DatabaseTable).dump(table)
+    return _jsonify({"result": result})
+
+
+@meta_api_v1.route('/db/<string:db_id>/batch/tables/',
+                   methods=['GET', 'POST'])
+@cached_response
+def table_batch(db_id):
+    """Show information about several tables at once.
+
+    Tables are identified by name or id, prefixed by the name or id of
+    their schema and a dot if they are not in the default schema. They
+    are given either as repeated `table` query parameters, or in the
+    `tables` list of a JSON request body.
+
+    **Example request**
+    .. code-block:: http
+        POST /db/S12_sdss/batch/tables/ HTTP/1.1
+        Accept: application/json
+        Content-Type: application/json
+
+        {"tables": ["Object", "Source", "sdss_stripe82_01.RunDeepSource"]}
+
+    **Example response**
+    .. code-block:: http
+       HTTP/1.1 200 OK
+       Content-Type: application/json
+
+        {
+            "results": [
+                { "name": "Object",
+                  "id": 12,
+                  "url": "...",
+                  "description": "The Object table contains descript...",
+                  "columns": [...]
+                },
+                ...
+            ],
+            "missing": []
+        }
+
+    Results are in the order of the request. Identifiers of tables that
+    do not exist are listed in `missing`.
+
+    :param db_id: Database identifier
+    :query table: Table identifier, may be repeated.
+
+    :statuscode 200: No Error
+    :statuscode 400: No table identifiers, or too many of them.
+    :statuscode 404: No database with that id found.
+    """
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        table_ids = body.get("tables") if isinstance(body, dict) else None
     else:
-        schema = database.default_schema.scalar()
-
-    table = session.query(MSDatabaseTable).filter(and_(
-        MSDatabaseTable.schema_id == schema.id,
-        or_(
-            MSDatabaseTable.name == table_id,
-            MSDatabaseTable.id == table_id)
-        )
-    ).scalar()
-
-    table_schema = DatabaseTable()
-    tables_result = table_schema.dump(table)
-    return jsonify({"result": tables_result.data})
+        table_ids = request.args.getlist("table")
+    max_tables = int(current_app.config.get(
+        "dax.metaserv.batch.max_tables", 1000))
+    if not table_ids or not isinstance(table_ids, list) or \
+            len(table_ids) > max_tables:
+        abort(400)
+
+    snapshot = Snapshot()
+    database = snapshot.database(db_id)
+    if database is None:
+        abort(404)
+    request.database = database
+
+    tables = []
+    missing = []
+    for table_id in table_ids:
+        table_id = str(table_id)
+        schema_id, _, name = table_id.rpartition(".")
+        schema = snapshot.schema(database, schema_id or None)
+        table = snapshot.table(schema, name) if schema is not None else None
+        if table is None:
+            missing.append(table_id)
+        else:
+            tables.append(table)
+
+    with _timed("serialize_time"):
+        results = fast_serializer(DatabaseTable).dump_many(tables)
+    return _jsonify({"results": results, "missing": missing})
+
+
+@meta_api_v1.route('/db/<string:db_id>/facets/', methods=['GET'])
+@cached_response
+def facets(db_id):
+    """Count the columns of a database per UCD or unit.
+
+    UCD words are counted at every level of their hierarchy: a column
+    with the UCD `pos.eq.ra;meta.main` counts for `pos`, `pos.eq`,
+    `pos.eq.ra`, `meta` and `meta.main`. One level is returned at a
+    time, starting with the top-level atoms.
+
+    **Example request**
+    .. code-block:: http
+        GET /db/S12_sdss/facets/?field=ucd&parent=pos HTTP/1.1
+        Accept: application/json
+
+    **Example response**
+    .. code-block:: http
+       HTTP/1.1 200 OK
+       Content-Type: application/json
+
+        {
+            "results": [
+                { "value": "pos.eq", "count": 42 },
+                { "value": "pos.galactic", "count": 4 },
+                ...
+            ]
+        }
+
+    :param db_id: Database identifier
+    :query field: `ucd` (default) or `unit`.
+    :query parent: For UCDs, the branch whose children are counted.
+
+    :statuscode 200: No Error
+    :statuscode 400: Invalid query parameter.
+    :statuscode 404: No database with that id found.
+    """
+    field = request.args.get("field", "ucd")
+    if field not in FACET_FIELDS:
+        abort(400)
+    snapshot = Snapshot()
+    database = snapshot.database(db_id)
+    if database is None:
+        abort(404)
+    counts = _snapshot_index(snapshot, FacetIndex).counts(
+        database.id, field, request.args.get("parent"))
+    return _jsonify({"results": [
+        OrderedDict([("value", value), ("count", count)])
+        for value, count in counts]})
+
+
+@meta_api_v1.route('/search/columns/', methods=['GET'])
+@cached_response
+def search_columns():
+    """Search the columns of all databases.
+
+    Every whitespace-separated term of the query must match a token of
+    the column name, description, UCD or unit. Values are split into
+    tokens on any character other than letters and digits, and whole
+    names, UCDs and units are tokens too.
+
+    **Example request**
+    .. code-block:: http
+        GET /search/columns/?q=pos.eq.ra&field=ucd HTTP/1.1
+        Accept: application/json
+
+    **Example response**
+    .. code-block:: http
+       HTTP/1.1 200 OK
+       Content-Type: application/json
+
+        {
+            "results": [
+                { "database": "S12_sdss",
+                  "schema": "sdss_stripe82_00",
+                  "table": "Object",
+                  "table_url": "...",
+                  "column": { "name": "ra", "ucd": "pos.eq.ra", ... }
+                },
+                ...
+            ]
+        }
+
+    :query q: Search terms.
+    :query field: Comma-separated list of the fields to search, among
+       `name`, `description`, `ucd` and `unit`. Defaults to all.
+    :query prefix: `false` to match whole tokens only. By default terms
+       also match token prefixes.
+    :query limit: Maximum number of results, 100 by default.
+
+    :statuscode 200: No Error
+    :statuscode 400: Invalid query parameter.
+    """
+    query = request.args.get("q", "")
+    if not query.strip():
+        abort(400)
+    fields = SEARCH_FIELDS
+    if request.args.get("field"):
+        fields = tuple(field.strip()
+                       for field in request.args["field"].split(","))
+        if set(fields) - set(SEARCH_FIELDS):
+            abort(400)
+    prefix = request.args.get("prefix", "true").lower() != "false"
+    limit = _int_arg("limit")
+    max_limit = int(current_app.config.get(
+        "dax.metaserv.search.max_limit", 1000))
+    limit = min(100 if limit is None else limit, max_limit)
+
+    snapshot = Snapshot()
+    matches = _snapshot_index(snapshot, ColumnSearchIndex).search(
+        query, fields, prefix, limit)
+    dump_column = fast_serializer(DatabaseColumn).dump
+    results = []
+    with _timed("serialize_time"):
+        for match in matches:
+            results.append(OrderedDict([
+                ("database", match.database.name),
+                ("schema", match.schema.name),
+                ("table", match.table.name),
+                ("table_url", resource_url(
+                    ".table", "table_id", match.table.id,
+                    db_id=match.database.id, schema_id=match.schema.id)),
+                ("column", dump_column(match.column))]))
+    return _jsonify({"results": results})
@@ -0,0 +1,190 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Asynchronous (ASGI) serving mode for the Metadata Server.
+
+`AsyncMetaServer` wraps the Flask application, which stays the single
+implementation of the routes. Client connections are held by the
+asyncio event loop, so that thousands of requests can be in flight,
+while the requests themselves run in a bounded pool of threads. Since
+the metadata is served from the in-memory snapshot, few requests wait
+on the database and a small pool keeps up with many connections.
+
+Responses are streamed back to the event loop chunk by chunk.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import io
+import sys
+
+_END = object()
+
+
+def _wsgi_environ(scope, body):
+    """Build a WSGI environ from an ASGI HTTP scope."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    path = scope.get("path", "/")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": "HTTP/%s" % scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == "CONTENT_LENGTH":
+            continue
+        key = "HTTP_" + name
+        if key in environ:
+            value = environ[key] + "," + value
+        environ[key] = value
+    return environ
+
+
+class AsyncMetaServer(object):
+    """ASGI application running a WSGI application in a thread pool.
+
+    :param wsgi_app: the WSGI application, e.g. the Flask app of
+    metaServer.py
+    :param max_workers: number of threads running requests
+    """
+
+    def __init__(self, wsgi_app, max_workers=8):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError("Unsupported ASGI scope %s" % scope["type"])
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def put(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        environ = _wsgi_environ(scope, body)
+        run = loop.run_in_executor(self.executor, self._run, environ, put)
+
+        started = False
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                if started:
+                    # Too late for an error response
+                    raise item
+                await self._send_start(send, "500 Internal Server Error",
+                                       [("Content-Type", "text/plain")])
+                await send({"type": "http.response.body",
+                            "body": b"Internal Server Error"})
+                await run
+                return
+            if isinstance(item, tuple):
+                status, headers = item
+                await self._send_start(send, status, headers)
+                started = True
+            else:
+                await send({"type": "http.response.body", "body": item,
+                            "more_body": True})
+        # Raises what the worker thread died with, if not an Exception
+        await run
+        await send({"type": "http.response.body", "body": b""})
+
+    def _run(self, environ, put):
+        """Run the WSGI application in a worker thread, and pass the
+        status, headers and body chunks to the event loop. `_END` is
+        always passed last, so that the event loop never waits for
+        a dead thread."""
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [(status, headers)]
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if response:
+                        put(response.pop())
+                    if chunk:
+                        put(chunk)
+            finally:
+                close = getattr(result, "close", None)
+                if close is not None:
+                    close()
+            if response:
+                put(response.pop())
+        except Exception as e:
+            put(e)
+        finally:
+            put(_END)
+
+    @staticmethod
+    async def _send_start(send, status, headers):
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(name.lower().encode("latin-1"),
+                         value.encode("latin-1"))
+                        for name, value in headers],
+        })
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,177 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compact, column-oriented storage of column metadata.
+
+A data release has millions of columns, and keeping one Python object
+per column costs several hundred bytes each. The `ColumnStore` keeps
+every column attribute in a typed `array`, with all the strings
+(names, descriptions, UCDs, units and datatypes) interned in a single
+string table. The columns of a table are stored contiguously, and a
+table only refers to its range of the store through a `ColumnSlice`.
+`Column` records are created on access only.
+"""
+
+from array import array
+from collections import namedtuple
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+Column = namedtuple("Column", [
+    "id", "table_id", "name", "description", "ordinal", "ucd", "unit",
+    "datatype", "nullable", "arraysize"])
+
+# Stands for None in the integer arrays
+_NULL_INT = -2 ** 63
+_NULLABLE = {None: -1, False: 0, True: 1}
+_FROM_NULLABLE = {-1: None, 0: False, 1: True}
+
+
+def _int(value):
+    return _NULL_INT if value is None else value
+
+
+def _from_int(value):
+    return None if value == _NULL_INT else value
+
+
+class ColumnStore(Sequence):
+    """Columns stored as parallel arrays.
+
+    Columns are added with `append`, grouped by table: all the columns
+    of a table must be appended one after the other.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self._string_index = {}
+        self._ids = array("q")
+        self._table_ids = array("q")
+        self._names = array("I")
+        self._descriptions = array("I")
+        self._ordinals = array("q")
+        self._ucds = array("I")
+        self._units = array("I")
+        self._datatypes = array("I")
+        self._nullables = array("b")
+        self._arraysizes = array("q")
+        self._ranges = {}
+
+    def _intern(self, value):
+        index = self._string_index.get(value)
+        if index is None:
+            index = self._string_index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def append(self, id, table_id, name, description, ordinal, ucd, unit,
+               datatype, nullable, arraysize):
+        """Add a column at the end of the store."""
+        position = len(self._ids)
+        start, stop = self._ranges.get(table_id, (position, position))
+        if stop != position:
+            raise ValueError("Columns of table %s are not contiguous" %
+                             table_id)
+        self._ranges[table_id] = (start, position + 1)
+
+        self._ids.append(id)
+        self._table_ids.append(table_id)
+        self._names.append(self._intern(name))
+        self._descriptions.append(self._intern(description))
+        self._ordinals.append(_int(ordinal))
+        self._ucds.append(self._intern(ucd))
+        self._units.append(self._intern(unit))
+        self._datatypes.append(self._intern(datatype))
+        self._nullables.append(_NULLABLE[None if nullable is None
+                                         else bool(nullable)])
+        self._arraysizes.append(_int(arraysize))
+
+    def extend(self, rows):
+        """Append columns from an iterable of `Column`-like tuples."""
+        for row in rows:
+            self.append(*row)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        strings = self.strings
+        return Column(self._ids[index],
+                      self._table_ids[index],
+                      strings[self._names[index]],
+                      strings[self._descriptions[index]],
+                      _from_int(self._ordinals[index]),
+                      strings[self._ucds[index]],
+                      strings[self._units[index]],
+                      strings[self._datatypes[index]],
+                      _FROM_NULLABLE[self._nullables[index]],
+                      _from_int(self._arraysizes[index]))
+
+    def table_columns(self, table_id):
+        """Return the columns of a table, as a `ColumnSlice`."""
+        start, stop = self._ranges.get(table_id, (0, 0))
+        return ColumnSlice(self, start, stop)
+
+    def nbytes(self):
+        """Approximate memory used by the arrays, excluding the string
+        table."""
+        return sum(a.itemsize * len(a) for a in (
+            self._ids, self._table_ids, self._names, self._descriptions,
+            self._ordinals, self._ucds, self._units, self._datatypes,
+            self._nullables, self._arraysizes))
+
+
+class ColumnSlice(Sequence):
+    """Read-only view of a contiguous range of a `ColumnStore`."""
+
+    __slots__ = ("_store", "_start", "_stop")
+
+    def __init__(self, store, start, stop):
+        self._store = store
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._store[self._start + index]
+
+    def __iter__(self):
+        store = self._store
+        for index in range(self._start, self._stop):
+            yield store[index]
+
+    def __repr__(self):
+        return repr(tuple(self))
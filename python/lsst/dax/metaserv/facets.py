@@ -0,0 +1,113 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Precomputed UCD and unit facets of the columns of a catalog snapshot.
+
+A UCD is a list of words separated by ";", each word being a
+hierarchy of atoms separated by "." (e.g. "pos.eq.ra;meta.main"). Every
+word of a column UCD is indexed together with its ancestors in the
+hierarchy, so that "pos.eq.*" selects all the columns with a word in
+the pos.eq branch, while "pos.eq.ra" selects that word only. Units
+are indexed as is.
+"""
+
+from collections import Counter
+
+#: Fields with facets
+FACET_FIELDS = ("ucd", "unit")
+
+
+def ucd_words(ucd):
+    """Return the lower-cased words of a UCD."""
+    if not ucd:
+        return []
+    return [word.strip().lower() for word in ucd.split(";") if word.strip()]
+
+
+def ucd_branches(word):
+    """Return a UCD word and its ancestors, e.g. "pos", "pos.eq" and
+    "pos.eq.ra" for "pos.eq.ra"."""
+    atoms = word.split(".")
+    return [".".join(atoms[:i]) for i in range(1, len(atoms) + 1)]
+
+
+class FacetIndex(object):
+    """Column ids and counts per UCD word, UCD branch and unit, for
+    every database of a snapshot.
+
+    :param databases: sequence of snapshot `Database` records
+    """
+
+    def __init__(self, databases):
+        self._ids = {"ucd": {}, "ucd_branch": {}, "unit": {}}
+        self._counts = {}
+        for database in databases:
+            counts = self._counts[database.id] = dict(
+                (field, Counter()) for field in FACET_FIELDS)
+            for schema in database.schemas:
+                for table in schema.tables:
+                    for column in table.columns:
+                        self._add(column, counts)
+
+    def _add(self, column, counts):
+        words = ucd_words(column.ucd)
+        for word in words:
+            self._ids["ucd"].setdefault(word, set()).add(column.id)
+        for branch in set(branch for word in words
+                          for branch in ucd_branches(word)):
+            self._ids["ucd_branch"].setdefault(branch, set()).add(column.id)
+            counts["ucd"][branch] += 1
+        if column.unit:
+            self._ids["unit"].setdefault(column.unit, set()).add(column.id)
+            counts["unit"][column.unit] += 1
+
+    def counts(self, db_id, field, parent=None):
+        """Return the facet counts of a database, as a list of
+        (<value>, <number of columns>) tuples sorted by value.
+
+        :param field: "ucd" or "unit"
+        :param parent: for UCDs, only return the direct children of
+        that branch; None for the top-level atoms.
+        """
+        counts = self._counts.get(db_id, {}).get(field, {})
+        if field == "ucd":
+            depth = len(parent.split(".")) + 1 if parent else 1
+            prefix = parent.lower() + "." if parent else ""
+            return sorted(
+                (value, count) for value, count in counts.items()
+                if value.startswith(prefix) and
+                len(value.split(".")) == depth)
+        return sorted(counts.items())
+
+    def column_ids(self, field, pattern):
+        """Return the set of ids of the columns matching a pattern.
+
+        :param field: "ucd" or "unit"
+        :param pattern: a unit, a UCD word, or a UCD branch followed by
+        ".*"
+        """
+        if field == "ucd":
+            pattern = pattern.strip().lower()
+            if pattern.endswith(".*"):
+                return self._ids["ucd_branch"].get(pattern[:-2], set())
+            return self._ids["ucd"].get(pattern, set())
+        return self._ids["unit"].get(pattern, set())
@@ -0,0 +1,227 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+In-process metrics, exposed in the Prometheus text format.
+
+Metrics are kept per server process: under uwsgi with several
+workers, every worker reports its own values, and each scrape reaches
+one of them. Run a single worker with threads, or aggregate by
+instance, to get the figures of a whole server.
+
+`RequestStats` accumulates what a request spends on SQL, serialization
+and JSON encoding, and is recorded into the metrics of a `Registry`
+once the response has been sent.
+"""
+
+from bisect import bisect_left
+import threading
+
+#: Buckets of durations, in seconds
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                0.5, 1.0, 2.5, 5.0, 10.0)
+#: Buckets of response sizes, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+                16777216, 67108864)
+#: Buckets of numbers of SQL queries
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace(
+        '"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = ['%s="%s"' % (name, _escape(value))
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+
+class Counter(object):
+    """Monotonic counter, per combination of label values."""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        label_values = tuple(label_values)
+        with self._lock:
+            self._values[label_values] = \
+                self._values.get(label_values, 0) + amount
+
+    def value(self, label_values=()):
+        return self._values.get(tuple(label_values), 0)
+
+    def samples(self):
+        """Yield the lines of the samples of the metric."""
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield "%s%s %s" % (self.name,
+                               _labels(self.label_names, label_values),
+                               _number(value))
+
+
+class Histogram(object):
+    """Cumulative histogram, per combination of label values.
+
+    :param buckets: increasing upper bounds of the buckets, +Inf is
+    added.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(),
+                 buckets=TIME_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_values=()):
+        label_values = tuple(label_values)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                # Per bucket counts, then the sum of the values
+                counts = self._values[label_values] = \
+                    [0] * (len(self.buckets) + 1) + [0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, label_values=()):
+        counts = self._values.get(tuple(label_values))
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        """Yield the lines of the samples of the metric."""
+        with self._lock:
+            values = sorted((label_values, list(counts))
+                            for label_values, counts in self._values.items())
+        for label_values, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),),
+                                    counts):
+                cumulative += count
+                yield "%s_bucket%s %d" % (
+                    self.name,
+                    _labels(self.label_names, label_values,
+                            'le="%s"' % _number(bound)),
+                    cumulative)
+            labels = _labels(self.label_names, label_values)
+            yield "%s_sum%s %s" % (self.name, labels, _number(counts[-1]))
+            yield "%s_count%s %d" % (self.name, labels, cumulative)
+
+
+class Registry(object):
+    """Set of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        """Register a metric, and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return all the metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append("# HELP %s %s" % (metric.name,
+                                           metric.documentation))
+            lines.append("# TYPE %s %s" % (metric.name, metric.type_name))
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class RequestStats(object):
+    """Time spent by a request in its stages, and its SQL queries."""
+
+    __slots__ = ("sql_queries", "sql_time", "serialize_time",
+                 "encode_time", "response_size")
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.encode_time = 0.0
+        self.response_size = 0
+
+
+class RequestMetrics(Registry):
+    """Metrics of the requests of the API, labelled by endpoint."""
+
+    def __init__(self):
+        Registry.__init__(self)
+        self.requests = self.add(Counter(
+            "metaserv_requests_total", "Requests handled.",
+            ("endpoint", "method", "status")))
+        self.latency = self.add(Histogram(
+            "metaserv_request_duration_seconds",
+            "Time to handle a request and send its response.",
+            ("endpoint",)))
+        self.sql_queries = self.add(Histogram(
+            "metaserv_request_sql_queries", "SQL queries per request.",
+            ("endpoint",), COUNT_BUCKETS))
+        self.sql_time = self.add(Histogram(
+            "metaserv_request_sql_duration_seconds",
+            "Time spent in SQL queries per request.", ("endpoint",)))
+        self.serialize_time = self.add(Histogram(
+            "metaserv_request_serialization_seconds",
+            "Time spent serializing records per request.", ("endpoint",)))
+        self.encode_time = self.add(Histogram(
+            "metaserv_request_json_encoding_seconds",
+            "Time spent encoding JSON per request.", ("endpoint",)))
+        self.response_size = self.add(Histogram(
+            "metaserv_response_size_bytes", "Size of response bodies.",
+            ("endpoint",), SIZE_BUCKETS))
+
+    def record(self, endpoint, method, status, duration, stats):
+        """Record a request, once its response has been sent."""
+        labels = (endpoint,)
+        self.requests.inc((endpoint, method, status))
+        self.latency.observe(duration, labels)
+        self.sql_queries.observe(stats.sql_queries, labels)
+        self.sql_time.observe(stats.sql_time, labels)
+        self.serialize_time.observe(stats.serialize_time, labels)
+        self.encode_time.observe(stats.encode_time, labels)
+        self.response_size.observe(stats.response_size, labels)
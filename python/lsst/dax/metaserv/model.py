@@ -19,7 +19,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from datetime import datetime
+
 from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, Text, DateTime
+from sqlalchemy import Index, MetaData, Table, select
+from sqlalchemy.engine.reflection import Inspector
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -63,7 +67,9 @@ class MSRepo(Base):
 
 class MSDatabase(Base):
     __tablename__ = 'MSDatabase'
-    __table_args__ = {'mysql_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('uq_MSDatabase_name', 'name', unique=True),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     repo_id = Column(Integer, ForeignKey("MSRepo.id"), nullable=True)
     name = Column(String(128))
@@ -80,7 +86,9 @@ class MSDatabase(Base):
 
 class MSDatabaseSchema(Base):
     __tablename__ = 'MSDatabaseSchema'
-    __table_args__ = {'mysql_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('uq_MSDatabaseSchema_db_id_name', 'db_id', 'name', unique=True),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     db_id = Column(Integer, ForeignKey("MSDatabase.id"))
     name = Column(String(128))
@@ -91,17 +99,24 @@ class MSDatabaseSchema(Base):
 
 class MSDatabaseTable(Base):
     __tablename__ = 'MSDatabaseTable'
-    __table_args__ = {'mysql_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('uq_MSDatabaseTable_schema_id_name', 'schema_id', 'name',
+              unique=True),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     schema_id = Column(Integer, ForeignKey("MSDatabaseSchema.id"))
     name = Column(String(128))
     description = Column(Text)
-    columns = relationship("MSDatabaseColumn", lazy="dynamic")
+    columns = relationship("MSDatabaseColumn", lazy="dynamic",
+                           order_by="MSDatabaseColumn.ordinal")
 
 
 class MSDatabaseColumn(Base):
     __tablename__ = 'MSDatabaseColumn'
-    __table_args__ = {'mysql_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('uq_MSDatabaseColumn_table_id_ordinal', 'table_id', 'ordinal',
+              unique=True),
+        {'mysql_engine': 'InnoDB'})
     id = Column(Integer, primary_key=True)
     table_id = Column(Integer, ForeignKey("MSDatabaseTable.id"))
     name = Column(String(128))
@@ -115,8 +130,107 @@ class MSDatabaseColumn(Base):
     arraysize = Column(Integer)
 
 
+class MSGeneration(Base):
+    """Generation counter of the catalog metadata. There is a single
+    row, of id `GENERATION_ID`, seeded by `init_db` and `upgrade_db`.
+    Its generation is bumped every time databases, schemas, tables or
+    columns are modified, so that servers holding a copy of the
+    metadata know when to reload it."""
+    __tablename__ = 'MSGeneration'
+    __table_args__ = {'mysql_engine': 'InnoDB'}
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    update_time = Column(DateTime)
+
+
+class MSTapExport(Base):
+    """Version of the schemas exported to a TAP_SCHEMA (see
+    `tap_schema`), one row per target and schema. The target
+    identifies the database and schema holding the TAP_SCHEMA
+    tables."""
+    __tablename__ = 'MSTapExport'
+    __table_args__ = {'mysql_engine': 'InnoDB'}
+    target = Column(String(255), primary_key=True)
+    schema_name = Column(String(128), primary_key=True)
+    version = Column(String(40), nullable=False)
+    export_time = Column(DateTime)
+
+
+#: Id of the single row of MSGeneration
+GENERATION_ID = 1
+
+
+def current_generation(session):
+    """Return the current metadata generation, 0 if never bumped."""
+    generation = session.query(MSGeneration.generation).filter(
+        MSGeneration.id == GENERATION_ID).scalar()
+    return generation or 0
+
+
+def bump_generation(session):
+    """Increment the metadata generation as part of the session's
+    transaction, and return the new value.
+
+    The generation row is updated in place, which locks it until the
+    end of the transaction, so that concurrent ingests are serialized
+    there. Raises RuntimeError if the row was not seeded, i.e. the
+    database was not upgraded.
+    """
+    updated = session.query(MSGeneration).filter(
+        MSGeneration.id == GENERATION_ID).update(
+        {MSGeneration.generation: MSGeneration.generation + 1,
+         MSGeneration.update_time: datetime.utcnow()},
+        synchronize_session=False)
+    if not updated:
+        raise RuntimeError("No metadata generation row, run upgrade-db")
+    return current_generation(session)
+
+
+def _seed_generation(engine):
+    """Create the generation row if needed. Rows left by older
+    versions, which inserted the row on the first bump, are merged
+    into it."""
+    table = MSGeneration.__table__
+    with engine.begin() as connection:
+        rows = connection.execute(
+            select([table.c.id, table.c.generation])).fetchall()
+        generation = max([row.generation for row in rows] or [0])
+        if not any(row.id == GENERATION_ID for row in rows):
+            connection.execute(table.insert(), dict(
+                id=GENERATION_ID, generation=generation,
+                update_time=datetime.utcnow()))
+        elif len(rows) > 1:
+            connection.execute(table.update().where(
+                table.c.id == GENERATION_ID).values(generation=generation))
+        connection.execute(table.delete().where(
+            table.c.id != GENERATION_ID))
+
+
 def init_db(engine):
     Base.metadata.create_all(engine, checkfirst=True)
+    _seed_generation(engine)
+
+
+def upgrade_db(engine):
+    """Bring the schema of an existing metaserv database up to date,
+    by creating the tables and indexes it is missing, and seeding the
+    generation row. Returns the names of the created indexes.
+
+    Creating a unique index fails if the existing rows violate it,
+    e.g. two databases with the same name.
+    """
+    Base.metadata.create_all(engine, checkfirst=True)
+    inspector = Inspector.from_engine(engine)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = set(index["name"]
+                       for index in inspector.get_indexes(table.name))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    _seed_generation(engine)
+    return created
 
 
 def _reinit_db(engine):
@@ -124,45 +238,57 @@ def _reinit_db(engine):
     init_db(engine)
 
 
-def session_maker(engine):
-    return sessionmaker(bind=engine)
-
-
-"""
-CREATE VIEW resource AS (
-    SELECT 'ivo://lsst.org/' || name  "ivoid",
-        'db' res_type,
-        null res_title,
-        null updated,
-        description res_description,
-        null creator_seq,
-        null source_value,
-        null waveband
-    FROM MSDatabase
-);
-"""
-
-"""
-CREATE VIEW res_schema AS (
-    SELECT db.ivoid || '/' || name  "ivoid",
-        description as schema_description
-    FROM MSDatabase db
-    NATURAL JOIN MSDatabaseSchema schema_
-);
-"""
-
-"""
-CREATE VIEW res_table AS (
-    SELECT schema_.ivoid || '/' || name  "ivoid"
-    name table_name, description table_description, null table_utype
-    FROM MSDatabaseSchema 
-    FROM MSDatabaseTable
-);
-"""
-
-"""
-CREATE VIEW table_column AS (
-    SELECT name table_name, description table_description, null table_utype
-    FROM MSDatabaseColumn
-);
-"""
+def session_maker(engine, **kwargs):
+    return sessionmaker(bind=engine, **kwargs)
+
+
+def tap_schema_metadata(schema="TAP_SCHEMA"):
+    """Return a `MetaData` with the TAP_SCHEMA tables of TAP 1.1.
+
+    :param schema: name of the database schema holding the tables,
+    None for the default schema of the connection.
+    """
+    metadata = MetaData(schema=schema)
+    Table("schemas", metadata,
+          Column("schema_name", String(128), primary_key=True),
+          Column("utype", String(512)),
+          Column("description", Text),
+          Column("schema_index", Integer),
+          mysql_engine="InnoDB")
+    Table("tables", metadata,
+          Column("schema_name", String(128), nullable=False, index=True),
+          Column("table_name", String(256), primary_key=True),
+          Column("table_type", String(8), nullable=False),
+          Column("utype", String(512)),
+          Column("description", Text),
+          Column("table_index", Integer),
+          mysql_engine="InnoDB")
+    Table("columns", metadata,
+          Column("table_name", String(256), primary_key=True),
+          Column("column_name", String(128), primary_key=True),
+          Column("utype", String(512)),
+          Column("ucd", String(1024)),
+          Column("unit", String(128)),
+          Column("description", Text),
+          Column("datatype", String(64), nullable=False),
+          Column("arraysize", String(16)),
+          Column("xtype", String(64)),
+          Column("size", Integer),
+          Column("principal", Integer, nullable=False),
+          Column("indexed", Integer, nullable=False),
+          Column("std", Integer, nullable=False),
+          Column("column_index", Integer),
+          mysql_engine="InnoDB")
+    Table("keys", metadata,
+          Column("key_id", String(64), primary_key=True),
+          Column("from_table", String(256), nullable=False),
+          Column("target_table", String(256), nullable=False),
+          Column("utype", String(512)),
+          Column("description", Text),
+          mysql_engine="InnoDB")
+    Table("key_columns", metadata,
+          Column("key_id", String(64), primary_key=True),
+          Column("from_column", String(128), primary_key=True),
+          Column("target_column", String(128), primary_key=True),
+          mysql_engine="InnoDB")
+    return metadata
@@ -0,0 +1,105 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+LRU cache of serialized API responses, bounded by the total size in
+bytes of the cached bodies.
+
+Entries are valid for a single metadata generation: the whole cache is
+dropped as soon as it is used with a different generation.
+"""
+
+from collections import namedtuple, OrderedDict
+import gzip
+import threading
+
+CachedResponse = namedtuple("CachedResponse",
+                            ["body", "gzip_body", "mimetype"])
+
+
+def make_entry(body, mimetype, gzip_min_size=None):
+    """Build a cache entry from a response body.
+
+    :param body: serialized response, as bytes
+    :param mimetype: mimetype of the response
+    :param gzip_min_size: if not None, bodies of at least that many
+    bytes are also stored gzip-compressed.
+    """
+    gzip_body = None
+    if gzip_min_size is not None and len(body) >= gzip_min_size:
+        gzip_body = gzip.compress(body)
+    return CachedResponse(body, gzip_body, mimetype)
+
+
+def _entry_size(entry):
+    return len(entry.body) + len(entry.gzip_body or b"")
+
+
+class ResponseCache(object):
+    """Thread-safe LRU cache of `CachedResponse` entries.
+
+    :param max_bytes: maximum total size of the cached bodies. Entries
+    larger than that are not cached at all.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.generation = None
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def validate(self, generation):
+        """Drop every entry if they were cached for another metadata
+        generation."""
+        if generation != self.generation:
+            with self._lock:
+                if generation != self.generation:
+                    self._entries.clear()
+                    self.size = 0
+                    self.generation = generation
+
+    def get(self, key):
+        """Return the entry cached under `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """Cache `entry` under `key`, evicting the least recently used
+        entries as needed."""
+        size = _entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= _entry_size(old)
+            while self._entries and self.size + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= _entry_size(evicted)
+            self._entries[key] = entry
+            self.size += size
@@ -0,0 +1,121 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Differences between the tables and columns stored in the Metadata
+Server and a freshly parsed schema, used to re-ingest a schema by
+applying only the needed inserts, updates and deletes.
+"""
+
+from collections import namedtuple
+
+#: Fields of MSDatabaseColumn set from a parsed schema
+COLUMN_FIELDS = ("name", "description", "ordinal", "ucd", "unit",
+                 "nullable", "datatype", "arraysize")
+
+#: Fields for which NULL and the empty string are the same value
+_TEXT_FIELDS = ("description", "ucd", "unit", "datatype")
+
+SchemaDiff = namedtuple("SchemaDiff", [
+    "insert_tables", "update_tables", "delete_tables",
+    "insert_columns", "update_columns", "delete_columns"])
+SchemaDiff.__doc__ = """Changes to apply to the stored schema.
+
+insert_tables: list of {"name", "description"} dicts
+update_tables: list of {"id", "description"} dicts
+delete_tables: list of table ids
+insert_columns: list of (<table name>, <column values>) tuples
+update_columns: list of column values dicts, including "id"
+delete_columns: list of column ids, including the columns of the
+deleted tables
+"""
+
+
+def column_values(column, ordinal):
+    """Return the MSDatabaseColumn values of a parsed column."""
+    return dict(name=column["name"],
+                description=column.get("description", ""),
+                ordinal=ordinal,
+                ucd=column.get("ucd", ""),
+                unit=column.get("unit", ""),
+                nullable=column.get("nullable", True),
+                datatype=column.get("datatype", ""),
+                arraysize=column.get("arraysize"))
+
+
+def _normalized(values):
+    values = dict((field, values.get(field)) for field in COLUMN_FIELDS)
+    for field in _TEXT_FIELDS:
+        if values[field] is None:
+            values[field] = ""
+    if values["nullable"] is not None:
+        values["nullable"] = bool(values["nullable"])
+    return values
+
+
+def diff_schema(stored_schema, parsed_schema):
+    """Compute the changes turning a stored schema into a parsed one.
+
+    :param stored_schema: dict mapping table names to dicts with the
+    "id" and "description" of the stored table and its "columns", a
+    list of dicts with the column "id" and `COLUMN_FIELDS`.
+    :param parsed_schema: parsed schema, as returned by `parse_schema`
+
+    Tables and columns are matched by name. Returns a `SchemaDiff`.
+    """
+    diff = SchemaDiff([], [], [], [], [], [])
+    for table_name, stored_table in stored_schema.items():
+        if table_name not in parsed_schema:
+            diff.delete_tables.append(stored_table["id"])
+            diff.delete_columns.extend(column["id"]
+                                       for column in stored_table["columns"])
+
+    for table_name, parsed_table in parsed_schema.items():
+        description = parsed_table.get("description", "")
+        parsed_columns = [
+            column_values(column, ordinal) for ordinal, column in
+            enumerate(parsed_table.get("columns", []))]
+        stored_table = stored_schema.get(table_name)
+        if stored_table is None:
+            diff.insert_tables.append(dict(name=table_name,
+                                           description=description))
+            diff.insert_columns.extend((table_name, values)
+                                       for values in parsed_columns)
+            continue
+        if (stored_table["description"] or "") != (description or ""):
+            diff.update_tables.append(dict(id=stored_table["id"],
+                                           description=description))
+
+        stored_columns = dict((column["name"], column)
+                              for column in stored_table["columns"])
+        parsed_names = set(values["name"] for values in parsed_columns)
+        for name, column in stored_columns.items():
+            if name not in parsed_names:
+                diff.delete_columns.append(column["id"])
+        for values in parsed_columns:
+            stored_column = stored_columns.get(values["name"])
+            if stored_column is None:
+                diff.insert_columns.append((table_name, values))
+            elif _normalized(stored_column) != _normalized(values):
+                update = dict(values)
+                update["id"] = stored_column["id"]
+                diff.update_columns.append(update)
+    return diff
@@ -21,9 +21,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import errno
+import hashlib
+import json
 import os
 import re
-import sys
+import tempfile
 
 """
 SchemaToMeta class parses mysql schema file that can optionally contain
@@ -63,6 +66,10 @@ _commentLine = re.compile(r'\s*--')
 _defaultLine = re.compile(r'\s+DEFAULT\s+(.+?)[\s,]')
 _size_parameter = re.compile(r'\((.+)\)')
 
+# Must be incremented whenever the output of the parser changes, to
+# invalidate the cached parsed schemas.
+PARSER_VERSION = 1
+
 MYSQL_TYPE_MAP = {
     'VARCHAR': "text",
     'TIMESTAMP': "timestamp",
@@ -98,114 +105,266 @@ def parse_schema(schema_file_path):
   }
   # repeated for every table
 }
+
+Raises IOError if the file does not exist, ValueError if it defines a
+table twice.
 """
+    return dict(iter_schema(schema_file_path))
+
+
+def parse_schema_cached(schema_file_path, cache_dir=None):
+    """Same as `parse_schema`, but the parsed schema is cached as JSON
+    in `cache_dir`, keyed by the hash of the file content and by the
+    parser version, so that unchanged files are not parsed again. No
+    cache is used if `cache_dir` is None.
+    """
+    return dict(iter_schema_cached(schema_file_path, cache_dir))
 
+
+def iter_schema_cached(schema_file_path, cache_dir=None):
+    """Same as `iter_schema`, with the cache of `parse_schema_cached`.
+
+    On a cache hit, the tables are read from the cache. On a miss, they
+    are still parsed incrementally, and written to the cache as they
+    are yielded; the cache entry is only created once the iterator is
+    exhausted.
+    """
+    if cache_dir is None:
+        return iter_schema(schema_file_path)
+    if not os.path.isfile(schema_file_path):
+        raise IOError(errno.ENOENT, "Schema File does not exist",
+                      schema_file_path)
+
+    with open(schema_file_path, mode='rb') as schema_file:
+        digest = hashlib.sha256(schema_file.read()).hexdigest()
+    cache_path = os.path.join(cache_dir, "%s-v%d.json" %
+                              (digest, PARSER_VERSION))
+    try:
+        with open(cache_path, mode='r') as cache_file:
+            return iter(json.load(cache_file).items())
+    except (IOError, ValueError):
+        pass
+    return _iter_caching(_iter_schema(schema_file_path), cache_dir,
+                         cache_path)
+
+
+def _iter_caching(tables, cache_dir, cache_path):
+    # Write to a temporary file first, so that concurrent readers
+    # never see a partial file. The cache is an optimization only, so
+    # failing to write it is ignored.
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        tmp_file = os.fdopen(fd, "w")
+    except (IOError, OSError):
+        tmp_file = None
+    try:
+        separator = "{"
+        for table_name, table in tables:
+            if tmp_file is not None:
+                try:
+                    tmp_file.write("%s%s: %s" % (separator,
+                                                 json.dumps(table_name),
+                                                 json.dumps(table)))
+                except (IOError, OSError):
+                    _discard(tmp_file, tmp_path)
+                    tmp_file = None
+                separator = ", "
+            yield table_name, table
+        if tmp_file is not None:
+            try:
+                tmp_file.write("}" if separator == ", " else "{}")
+                tmp_file.close()
+                os.rename(tmp_path, cache_path)
+            except (IOError, OSError):
+                _discard(tmp_file, tmp_path)
+            tmp_file = None
+    finally:
+        if tmp_file is not None:
+            _discard(tmp_file, tmp_path)
+
+
+def _discard(tmp_file, tmp_path):
+    try:
+        tmp_file.close()
+        os.remove(tmp_path)
+    except (IOError, OSError):
+        pass
+
+
+def compare_schema(parsed_schema, db_columns):
+    """Compare a parsed schema with the columns found in a database.
+
+    :param parsed_schema: parsed schema, as returned by `parse_schema`
+    :param db_columns: dict mapping every table name of the database
+    schema to the list of its column names
+
+    Tables present in the database but not in the parsed schema are
+    allowed. Returns the list of all mismatches found, as
+    (<kind>, <message>) tuples where kind is one of "TB_NOT_IN_DB",
+    "NOT_MATCHING", "COL_NOT_IN_TB" and "COL_NOT_IN_FL".
+    """
+    mismatches = []
+    for table_name, parsed_table in parsed_schema.items():
+        if table_name not in db_columns:
+            mismatches.append((
+                "TB_NOT_IN_DB",
+                "Table '%s' not found in db, present in ascii file." %
+                table_name))
+            continue
+        table_columns = db_columns[table_name]
+        parsed_columns = [column["name"]
+                          for column in parsed_table.get("columns", [])]
+        if len(parsed_columns) != len(table_columns):
+            mismatches.append((
+                "NOT_MATCHING",
+                "Number of columns in db for table %s (%d) differs from "
+                "number columns in schema (%d)" %
+                (table_name, len(table_columns), len(parsed_columns))))
+        table_column_set = set(table_columns)
+        parsed_column_set = set(parsed_columns)
+        for column_name in parsed_columns:
+            if column_name not in table_column_set:
+                mismatches.append((
+                    "COL_NOT_IN_TB",
+                    "Column '%s.%s' not found in db, but exists in "
+                    "schema DDL" % (table_name, column_name)))
+        for column_name in table_columns:
+            if column_name not in parsed_column_set:
+                mismatches.append((
+                    "COL_NOT_IN_FL",
+                    "Column '%s.%s' not found in schema DDL, but exists "
+                    "in db" % (table_name, column_name)))
+    return mismatches
+
+
+def iter_schema(schema_file_path):
+    """Parse a schema file incrementally. Returns an iterator over
+    (<tableName>, <table>) tuples, each table being yielded as soon as
+    its definition ends. Tables have the structure documented in
+    `parse_schema`.
+
+    Raises IOError if the file does not exist. The iterator raises
+    ValueError when it reaches a second definition of a table.
+    """
     if not os.path.isfile(schema_file_path):
-        sys.stderr.write("Schema File '%s' does not exist\n" % schema_file_path)
-        sys.exit(1)
+        raise IOError(errno.ENOENT, "Schema File does not exist",
+                      schema_file_path)
+    return _iter_schema(schema_file_path)
 
-    schema_file = open(schema_file_path, mode='r')
 
+def _iter_schema(schema_file_path):
+    table_name = None
     table = None
     column = None
     column_description = None
     seen_description = False
-    schema = {}
-
-    for line in schema_file:
-        m = _tableStart.search(line)
-        if m is not None and not _isCommentLine(line):
-            table_name = m.group(1)
-            table = schema.setdefault(table_name, {})
-            column = None
-        elif _tableEnd.match(line):
-            m = _engineLine.match(line)
-            if m is not None:
-                mysql_engine_name = m.group(2)
-                table["engine"] = mysql_engine_name
-            table = None
-        elif table is not None:  # process columns for given table
-            m = _columnLine.match(line)
-            if m is not None:
-                first_token = m.group(1)
-                if _isIndexDefinition(first_token):
-                    t = "-"
-                    if first_token == "PRIMARY":
-                        t = "PRIMARY KEY"
-                    elif first_token == "UNIQUE":
-                        t = "UNIQUE"
-                    idx_info = {
-                        "type": t,
-                        "columns": _retrIdxColumns(line)
+    table_names = set()
+
+    with open(schema_file_path, mode='r') as schema_file:
+        for line in schema_file:
+            m = _tableStart.search(line)
+            if m is not None and not _isCommentLine(line):
+                if table is not None:
+                    yield table_name, table
+                table_name = m.group(1)
+                if table_name in table_names:
+                    raise ValueError("Table %s is defined twice in %s" %
+                                     (table_name, schema_file_path))
+                table_names.add(table_name)
+                table = {}
+                column = None
+            elif _tableEnd.match(line):
+                m = _engineLine.match(line)
+                if table is not None:
+                    if m is not None:
+                        mysql_engine_name = m.group(2)
+                        table["engine"] = mysql_engine_name
+                    yield table_name, table
+                table = None
+            elif table is not None:  # process columns for given table
+                m = _columnLine.match(line)
+                if m is not None:
+                    first_token = m.group(1)
+                    if _isIndexDefinition(first_token):
+                        t = "-"
+                        if first_token == "PRIMARY":
+                            t = "PRIMARY KEY"
+                        elif first_token == "UNIQUE":
+                            t = "UNIQUE"
+                        idx_info = {
+                            "type": t,
+                            "columns": _retrIdxColumns(line)
+                            }
+                        table.setdefault("indexes", []).append(idx_info)
+                    else:
+                        datatype, arraysize = _retrType(line)
+                        if datatype.lower() not in MYSQL_TYPE_MAP.values():
+                            datatype = MYSQL_TYPE_MAP[datatype.upper()]
+                        if datatype == "boolean":
+                            arraysize = None
+                        column = {
+                            "name": first_token,
+                            "datatype": datatype,
+                            "arraysize": arraysize,
+                            "nullable": not _retrIsNotNull(line),
                         }
-                    table.setdefault("indexes", []).append(idx_info)
-                else:
-                    datatype, arraysize = _retrType(line)
-                    if datatype.lower() not in MYSQL_TYPE_MAP.values():
-                        datatype = MYSQL_TYPE_MAP[datatype.upper()]
-                    if datatype == "boolean":
-                        arraysize = None
-                    column = {
-                        "name": first_token,
-                        "datatype": datatype,
-                        "arraysize": arraysize,
-                        "nullable": not _retrIsNotNull(line),
-                    }
-                    dv = _retrDefaultValue(line)
-                    if dv is not None:
-                        column["defaultValue"] = dv
-                    if "columns" not in table:
-                        table["columns"] = []
-                    table["columns"].append(column)
-            elif _isCommentLine(line):  # handle comments
-                if column is None:
-                    # table comment
-                    if _containsDescrTagStart(line):
-                        if _containsDescrTagEnd(line):
-                            table["description"] = _retrDescr(line)
-                        else:
-                            table["description"] = _retrDescrStart(line)
-                    elif "description" in table:
-                        if _containsDescrTagEnd(line):
-                            table["description"] += _retrDescrEnd(line)
-                        else:
-                            table["description"] += _retrDescrMid(line)
-                else:
-                    # column comment
-                    if _containsDescrTagStart(line):
-                        if _containsDescrTagEnd(line):
-                            column["description"] = _retrDescr(line)
-                        else:
-                            column["description"] = _retrDescrStart(line)
-                            column_description = 1
-                    elif column_description:
-                        if _containsDescrTagEnd(line):
-                            more = _retrDescrEnd(line)
-                            if seen_description:
-                                more = more.strip() + "\n"
-                            column["description"] += more
-                            column_description = None
-                            seen_description = False
-                        else:
-                            more = _retrDescrMid(line)
-                            if not more.strip():
-                                seen_description = True
-                            # Add newlines if we've seen the description
-                            # and strip the left columns (yaml support)
-                            if seen_description:
-                                more = more.strip() + "\n"
-                            column["description"] += more
-
-                    # units
-                    if _isUnitLine(line):
-                        column["unit"] = _retrUnit(line)
-
-                    # ucds
-                    if _isUcdLine(line):
-                        column["ucd"] = _retrUcd(line)
-
-    schema_file.close()
-    return schema
+                        dv = _retrDefaultValue(line)
+                        if dv is not None:
+                            column["defaultValue"] = dv
+                        if "columns" not in table:
+                            table["columns"] = []
+                        table["columns"].append(column)
+                elif _isCommentLine(line):  # handle comments
+                    if column is None:
+                        # table comment
+                        if _containsDescrTagStart(line):
+                            if _containsDescrTagEnd(line):
+                                table["description"] = _retrDescr(line)
+                            else:
+                                table["description"] = _retrDescrStart(line)
+                        elif "description" in table:
+                            if _containsDescrTagEnd(line):
+                                table["description"] += _retrDescrEnd(line)
+                            else:
+                                table["description"] += _retrDescrMid(line)
+                    else:
+                        # column comment
+                        if _containsDescrTagStart(line):
+                            if _containsDescrTagEnd(line):
+                                column["description"] = _retrDescr(line)
+                            else:
+                                column["description"] = _retrDescrStart(line)
+                                column_description = 1
+                        elif column_description:
+                            if _containsDescrTagEnd(line):
+                                more = _retrDescrEnd(line)
+                                if seen_description:
+                                    more = more.strip() + "\n"
+                                column["description"] += more
+                                column_description = None
+                                seen_description = False
+                            else:
+                                more = _retrDescrMid(line)
+                                if not more.strip():
+                                    seen_description = True
+                                # Add newlines if we've seen the description
+                                # and strip the left columns (yaml support)
+                                if seen_description:
+                                    more = more.strip() + "\n"
+                                column["description"] += more
+
+                        # units
+                        if _isUnitLine(line):
+                            column["unit"] = _retrUnit(line)
+
+                        # ucds
+                        if _isUcdLine(line):
+                            column["ucd"] = _retrUcd(line)
+
+    if table is not None:
+        yield table_name, table
 
 
 def _isIndexDefinition(c):
@@ -0,0 +1,136 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+In-memory inverted index over the columns of all the databases, used
+to find columns by name, description, UCD or unit.
+
+Values are split into lower-case tokens on any character other than
+letters and digits; the whole lower-cased name, UCD and unit are
+indexed as well, so that e.g. "pos.eq.ra" or "u_psfFlux" match
+exactly. A query is a list of terms, all of which must match a token
+of the column, either exactly or as a prefix.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+import re
+
+#: Indexed column fields
+SEARCH_FIELDS = ("name", "description", "ucd", "unit")
+
+_TOKEN = re.compile(r"[0-9A-Za-z]+")
+
+SearchResult = namedtuple("SearchResult",
+                          ["database", "schema", "table", "column"])
+
+
+def tokenize(value, whole=True):
+    """Return the set of tokens of a value.
+
+    :param whole: whether the whole lower-cased value is a token too
+    """
+    if not value:
+        return set()
+    value = value.lower()
+    tokens = set(_TOKEN.findall(value))
+    if whole:
+        tokens.add(value.strip())
+    return tokens
+
+
+class ColumnSearchIndex(object):
+    """Inverted index over the columns of a catalog snapshot.
+
+    :param databases: sequence of snapshot `Database` records
+    """
+
+    def __init__(self, databases):
+        self._tables = []
+        self._entry_tables = array("I")
+        self._entry_columns = array("I")
+        postings = dict((field, {}) for field in SEARCH_FIELDS)
+        for database in databases:
+            for schema in database.schemas:
+                for table in schema.tables:
+                    table_index = len(self._tables)
+                    self._tables.append((database, schema, table))
+                    for position, column in enumerate(table.columns):
+                        entry = len(self._entry_tables)
+                        self._entry_tables.append(table_index)
+                        self._entry_columns.append(position)
+                        for field in SEARCH_FIELDS:
+                            tokens = tokenize(getattr(column, field),
+                                              whole=field != "description")
+                            field_postings = postings[field]
+                            for token in tokens:
+                                field_postings.setdefault(
+                                    token, array("I")).append(entry)
+        self._postings = postings
+        self._tokens = dict((field, sorted(postings[field]))
+                            for field in SEARCH_FIELDS)
+
+    def __len__(self):
+        return len(self._entry_tables)
+
+    def _match_term(self, term, fields, prefix):
+        entries = set()
+        for field in fields:
+            postings = self._postings[field]
+            if not prefix:
+                entries.update(postings.get(term, ()))
+                continue
+            tokens = self._tokens[field]
+            i = bisect_left(tokens, term)
+            while i < len(tokens) and tokens[i].startswith(term):
+                entries.update(postings[tokens[i]])
+                i += 1
+        return entries
+
+    def search(self, query, fields=SEARCH_FIELDS, prefix=True, limit=100):
+        """Return the columns matching all the terms of `query`.
+
+        :param query: whitespace-separated terms
+        :param fields: fields a term may match
+        :param prefix: whether terms match token prefixes, or only
+        whole tokens
+        :param limit: maximum number of results
+
+        Returns a list of `SearchResult`, in catalog order.
+        """
+        terms = [term for term in query.lower().split() if term]
+        if not terms:
+            return []
+        entries = None
+        # Match the longest, hence most selective, terms first
+        for term in sorted(terms, key=len, reverse=True):
+            matched = self._match_term(term, fields, prefix)
+            entries = matched if entries is None else entries & matched
+            if not entries:
+                return []
+        results = []
+        for entry in sorted(entries)[:limit]:
+            database, schema, table = \
+                self._tables[self._entry_tables[entry]]
+            column = table.columns[self._entry_columns[entry]]
+            results.append(SearchResult(database, schema, table, column))
+        return results
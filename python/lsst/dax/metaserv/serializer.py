@@ -0,0 +1,149 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Precompiled serializers for the records of the API.
+
+Marshmallow resolves every field of every object through field
+objects at dump time. A `Serializer` is instead compiled once from a
+list of `FieldSpec` into a plain Python function, with one statement
+per field, which produces the same ordered dict as the marshmallow
+schema the specs describe (see `api_model.fast_serializer`):
+
+* string, integer and boolean values are converted as marshmallow
+  does, and None is kept as None;
+* a field whose attribute is missing, or whose dotted path of
+  attributes goes through None, is left out of the result;
+* function fields call their function with the object;
+* nested fields are serialized with another `Serializer`.
+"""
+
+from collections import namedtuple, OrderedDict
+import re
+
+FieldSpec = namedtuple("FieldSpec", ["key", "attribute", "kind", "argument"])
+FieldSpec.__doc__ = """Serialization of one field.
+
+key: key of the field in the result
+attribute: attribute of the object, or dotted path of attributes
+kind: "string", "integer", "boolean", "function", "nested" or
+"nested_many", for a nested list of objects
+argument: the function of a function field, the `Serializer` of a
+nested field, None otherwise
+"""
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+
+_MISSING = object()
+
+
+def _string(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+# Values of marshmallow.fields.Boolean
+_TRUTHY = frozenset(("t", "T", "true", "True", "TRUE", "1", 1, True))
+_FALSY = frozenset(("f", "F", "false", "False", "FALSE", "0", 0, 0.0, False))
+
+
+def _boolean(value):
+    if value in _TRUTHY:
+        return True
+    if value in _FALSY:
+        return False
+    return bool(value)
+
+
+def _get_path(obj, path):
+    for name in path:
+        obj = getattr(obj, name, _MISSING)
+        if obj is _MISSING:
+            break
+    return obj
+
+
+_CONVERSIONS = {
+    "string": "_string(value)",
+    "integer": "int(value)",
+    "boolean": "_boolean(value)",
+}
+
+
+class Serializer(object):
+    """Function serializing objects to ordered dicts, compiled from
+    field specs.
+
+    :param name: name of the serialized shape, for tracebacks
+    :param specs: sequence of `FieldSpec`, in output order
+    """
+
+    def __init__(self, name, specs):
+        self.name = name
+        self.specs = tuple(specs)
+        self.dump = self._compile()
+
+    def _compile(self):
+        namespace = {"_OrderedDict": OrderedDict, "_string": _string,
+                     "_boolean": _boolean, "_get_path": _get_path,
+                     "_MISSING": _MISSING}
+        lines = ["def dump(obj):",
+                 "    result = _OrderedDict()"]
+        for index, spec in enumerate(self.specs):
+            key = repr(spec.key)
+            if spec.kind == "function":
+                namespace["_function%d" % index] = spec.argument
+                lines.append("    result[%s] = _function%d(obj)" %
+                             (key, index))
+                continue
+            path = spec.attribute.split(".")
+            if not all(_IDENTIFIER.match(name) for name in path):
+                raise ValueError("Invalid attribute %r" % spec.attribute)
+            if len(path) == 1:
+                lines.append("    value = getattr(obj, %r, _MISSING)" %
+                             path[0])
+            else:
+                namespace["_path%d" % index] = tuple(path)
+                lines.append("    value = _get_path(obj, _path%d)" % index)
+            lines.append("    if value is not _MISSING:")
+            if spec.kind == "nested":
+                namespace["_nested%d" % index] = spec.argument.dump
+                conversion = "_nested%d(value)" % index
+            elif spec.kind == "nested_many":
+                namespace["_nested%d" % index] = spec.argument.dump_many
+                conversion = "_nested%d(value)" % index
+            elif spec.kind in _CONVERSIONS:
+                conversion = _CONVERSIONS[spec.kind]
+            else:
+                raise ValueError("Unsupported field kind %r" % spec.kind)
+            lines.append("        result[%s] = None if value is None "
+                         "else %s" % (key, conversion))
+        lines.append("    return result")
+        code = compile("\n".join(lines), "<serializer %s>" % self.name,
+                       "exec")
+        exec(code, namespace)
+        return namespace["dump"]
+
+    def dump_many(self, objs):
+        """Serialize a sequence of objects to a list."""
+        dump = self.dump
+        return [dump(obj) for obj in objs]
@@ -0,0 +1,272 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+In-memory, read-only snapshot of the catalog metadata
+(databases, schemas, tables and columns).
+
+The metadata only changes when it is ingested through admin_cli, so
+every server process keeps a snapshot of the whole tree and serves
+lookups from it. The snapshot is reloaded when the generation counter
+stored in the metadata database (see `model.MSGeneration`) changes.
+
+Every database and schema carries a version, a digest of its content
+computed once at load time, which stays the same across reloads as
+long as the content does not change. It is meant to be used for HTTP
+validators such as ETags.
+
+Columns are kept in a `ColumnStore`, and the `columns` of a `Table` is
+a read-only `ColumnSlice` of that store, in ordinal order.
+"""
+
+from collections import namedtuple, OrderedDict
+from datetime import timezone
+import hashlib
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from .column_store import ColumnStore
+from .model import MSDatabase, MSDatabaseSchema, MSDatabaseTable, \
+    MSDatabaseColumn, MSGeneration, GENERATION_ID, current_generation
+
+_log = logging.getLogger("lsst.metaserv.snapshot")
+
+Database = namedtuple("Database", [
+    "id", "name", "description", "conn_host", "conn_port", "schemas",
+    "default_schema", "version"])
+
+Schema = namedtuple("Schema", [
+    "id", "db_id", "name", "description", "is_default_schema", "tables",
+    "version"])
+
+Table = namedtuple("Table", [
+    "id", "schema_id", "name", "description", "columns"])
+
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def _schema_digest(db_row, schema_row, tables):
+    """Digest of a schema and its tables, fed one table and one column
+    at a time so that the columns are never all materialized."""
+    digest = hashlib.sha1(repr((tuple(db_row), tuple(schema_row))).encode(
+        "utf-8"))
+    for table in tables:
+        digest.update(repr(table[:-1]).encode("utf-8"))
+        for column in table.columns:
+            digest.update(repr(column).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _index(records, key):
+    return MappingProxyType(
+        OrderedDict((getattr(record, key), record) for record in records))
+
+
+class CatalogSnapshot(object):
+    """Immutable copy of the catalog tree, with lookups by id and by
+    name at every level.
+
+    :param generation: metadata generation the snapshot was loaded at
+    :param databases: sequence of `Database` records
+    :param update_time: time of the last metadata modification, as a
+    timezone-aware datetime, if known
+    :param column_store: `ColumnStore` holding the columns of the
+    tables, if any
+    """
+
+    def __init__(self, generation, databases, update_time=None,
+                 column_store=None):
+        self.generation = generation
+        self.update_time = update_time
+        self.column_store = column_store
+        self.databases = tuple(databases)
+        self.version = _digest(*(db.version for db in self.databases))
+        self._databases_by_id = _index(self.databases, "id")
+        self._databases_by_name = _index(self.databases, "name")
+        self._schemas_by_id = {}
+        self._schemas_by_name = {}
+        self._tables_by_id = {}
+        self._tables_by_name = {}
+        for database in self.databases:
+            self._schemas_by_id[database.id] = _index(database.schemas, "id")
+            self._schemas_by_name[database.id] = _index(database.schemas,
+                                                        "name")
+            for schema in database.schemas:
+                self._tables_by_id[schema.id] = _index(schema.tables, "id")
+                self._tables_by_name[schema.id] = _index(schema.tables,
+                                                         "name")
+
+    @staticmethod
+    def _lookup(by_name, by_id, key):
+        record = by_name.get(key)
+        if record is None and by_id:
+            try:
+                record = by_id.get(int(key))
+            except (TypeError, ValueError):
+                pass
+        return record
+
+    def database(self, db_id):
+        """Return the database with the given name or id, or None."""
+        return self._lookup(self._databases_by_name, self._databases_by_id,
+                            db_id)
+
+    def schema(self, database, schema_id=None):
+        """Return the schema of `database` with the given name or id,
+        the default schema if `schema_id` is None, or None if there is
+        no such schema."""
+        if schema_id is None:
+            return database.default_schema
+        return self._lookup(self._schemas_by_name[database.id],
+                            self._schemas_by_id[database.id], schema_id)
+
+    def table(self, schema, table_id):
+        """Return the table of `schema` with the given name or id, or
+        None."""
+        return self._lookup(self._tables_by_name[schema.id],
+                            self._tables_by_id[schema.id], table_id)
+
+
+def _group(rows, key_index):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[key_index], []).append(row)
+    return groups
+
+
+def load_snapshot(session):
+    """Load the whole catalog tree with one query per level.
+
+    The generation is read before the metadata, so that a concurrent
+    ingest is at worst picked up by the next generation check.
+    """
+    generation_row = session.query(
+        MSGeneration.generation, MSGeneration.update_time).filter(
+        MSGeneration.id == GENERATION_ID).first()
+    generation, update_time = generation_row or (0, None)
+    if update_time is not None and update_time.tzinfo is None:
+        # Stored as naive UTC
+        update_time = update_time.replace(tzinfo=timezone.utc)
+
+    # Columns are streamed straight into the store, grouped by table and
+    # in ordinal order, as read from the (table_id, ordinal) index.
+    columns = ColumnStore()
+    columns.extend(session.query(
+        MSDatabaseColumn.id, MSDatabaseColumn.table_id,
+        MSDatabaseColumn.name, MSDatabaseColumn.description,
+        MSDatabaseColumn.ordinal, MSDatabaseColumn.ucd,
+        MSDatabaseColumn.unit, MSDatabaseColumn.datatype,
+        MSDatabaseColumn.nullable, MSDatabaseColumn.arraysize).order_by(
+        MSDatabaseColumn.table_id, MSDatabaseColumn.ordinal).yield_per(
+        10000))
+    tables = _group(session.query(
+        MSDatabaseTable.id, MSDatabaseTable.schema_id,
+        MSDatabaseTable.name, MSDatabaseTable.description).order_by(
+        MSDatabaseTable.id), 1)
+    schemas = _group(session.query(
+        MSDatabaseSchema.id, MSDatabaseSchema.db_id,
+        MSDatabaseSchema.name, MSDatabaseSchema.description,
+        MSDatabaseSchema.is_default_schema).order_by(
+        MSDatabaseSchema.id), 1)
+    db_rows = session.query(
+        MSDatabase.id, MSDatabase.name, MSDatabase.description,
+        MSDatabase.conn_host, MSDatabase.conn_port).order_by(MSDatabase.id)
+
+    databases = []
+    for db_row in db_rows:
+        db_schemas = []
+        for schema_row in schemas.get(db_row.id, ()):
+            schema_tables = []
+            for table_row in tables.get(schema_row.id, ()):
+                schema_tables.append(Table(
+                    *table_row,
+                    columns=columns.table_columns(table_row.id)))
+            schema_tables = tuple(schema_tables)
+            db_schemas.append(Schema(
+                *schema_row, tables=schema_tables,
+                version=_schema_digest(db_row, schema_row, schema_tables)))
+        default_schema = next(
+            (schema for schema in db_schemas if schema.is_default_schema),
+            None)
+        databases.append(Database(
+            *db_row, schemas=tuple(db_schemas),
+            default_schema=default_schema,
+            version=_digest(tuple(db_row),
+                            *(schema.version for schema in db_schemas))))
+    return CatalogSnapshot(generation, databases, update_time, columns)
+
+
+class SnapshotCache(object):
+    """Holds the snapshot of one server process and reloads it when
+    the metadata generation changes. If the metadata database cannot be
+    reached, the current snapshot is served until the next check.
+
+    :param check_interval: minimum number of seconds between two
+    checks of the generation stored in the metadata database.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, session):
+        """Return the current snapshot, reloading it through `session`
+        if needed. `session` may be a session or a callable returning
+        one, in which case it is only called when the database has to
+        be contacted."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._fresh():
+            return snapshot
+        with self._lock:
+            if self._snapshot is not snapshot or \
+                    (snapshot is not None and self._fresh()):
+                # Another thread checked or reloaded while we were
+                # waiting.
+                return self._snapshot
+            if callable(session):
+                session = session()
+            try:
+                if snapshot is None or \
+                        current_generation(session) != snapshot.generation:
+                    self._snapshot = load_snapshot(session)
+            except SQLAlchemyError:
+                if snapshot is None:
+                    raise
+                # Keep serving the current snapshot until the next check
+                _log.exception("Checking the metadata generation failed")
+                session.rollback()
+            self._checked = time.time()
+            return self._snapshot
+
+    def _fresh(self):
+        return time.time() - self._checked < self.check_interval
+
+    def invalidate(self):
+        """Force a generation check on the next access."""
+        self._checked = 0.0
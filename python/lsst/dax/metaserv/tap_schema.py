@@ -0,0 +1,209 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Export of the catalog metadata as TAP_SCHEMA rows (TAP 1.1) and as a
+VOSI tableset document.
+
+Every metaserv schema becomes a TAP schema of the same name, and its
+tables are qualified with that name. The functions here only map the
+records of a catalog snapshot (see `snapshot.load_snapshot`) to rows
+or XML, lazily, so that they can be streamed to a database or a file;
+the TAP_SCHEMA tables themselves are defined in `model`.
+
+TAP_SCHEMA is refreshed incrementally: the version of every exported
+schema is recorded in the metaserv database (see `model.MSTapExport`),
+and only the schemas whose version changed are rewritten.
+"""
+
+import hashlib
+from xml.sax.saxutils import escape, quoteattr
+
+#: Must be incremented whenever the exported rows change for the same
+#: metadata, to force a full refresh.
+EXPORT_VERSION = 1
+
+#: TAP datatype and xtype of the metaserv datatypes which are not TAP
+#: datatypes
+_DATATYPES = {
+    "text": ("char", None),
+    "timestamp": ("char", "timestamp"),
+    "binary": ("unsignedByte", None),
+}
+
+VOSI_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<vosi:tableset'
+    ' xmlns:vosi="http://www.ivoa.net/xml/VOSITables/v1.0"'
+    ' xmlns:vs="http://www.ivoa.net/xml/VODataService/v1.1"'
+    ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n')
+VOSI_FOOTER = '</vosi:tableset>\n'
+
+
+def _or_none(value):
+    return value if value else None
+
+
+def column_datatype(datatype, arraysize):
+    """Return the TAP (datatype, arraysize, xtype) of a column.
+
+    Strings and binary columns are variable-length arrays, bounded by
+    their size if known. The size of other types (e.g. INT(11)) is a
+    display width, and is ignored.
+    """
+    tap_datatype, xtype = _DATATYPES.get(datatype, (datatype, None))
+    if datatype not in _DATATYPES:
+        return tap_datatype, None, xtype
+    return tap_datatype, "%d*" % arraysize if arraysize else "*", xtype
+
+
+def table_name(schema, table):
+    """Return the qualified TAP name of a table."""
+    return "%s.%s" % (schema.name, table.name)
+
+
+def iter_schemas(databases):
+    """Yield the schemas of all the databases.
+
+    Raises ValueError if two databases have a schema with the same
+    name, as TAP schema names are global.
+    """
+    names = set()
+    for database in databases:
+        for schema in database.schemas:
+            if schema.name in names:
+                raise ValueError("Schema %s is in several databases" %
+                                 schema.name)
+            names.add(schema.name)
+            yield schema
+
+
+def schema_version(schema):
+    """Return the exported version of a schema."""
+    return hashlib.sha1(repr((EXPORT_VERSION, schema.version)).encode(
+        "utf-8")).hexdigest()
+
+
+def schema_row(schema):
+    """Return the TAP_SCHEMA.schemas row of a schema."""
+    return dict(schema_name=schema.name,
+                utype=None,
+                description=_or_none(schema.description),
+                schema_index=None)
+
+
+def table_rows(schema):
+    """Yield the TAP_SCHEMA.tables rows of a schema."""
+    for index, table in enumerate(schema.tables):
+        yield dict(schema_name=schema.name,
+                   table_name=table_name(schema, table),
+                   table_type="table",
+                   utype=None,
+                   description=_or_none(table.description),
+                   table_index=index + 1)
+
+
+def column_rows(schema):
+    """Yield the TAP_SCHEMA.columns rows of a schema."""
+    for table in schema.tables:
+        name = table_name(schema, table)
+        for column in table.columns:
+            datatype, arraysize, xtype = column_datatype(column.datatype,
+                                                         column.arraysize)
+            yield dict(table_name=name,
+                       column_name=column.name,
+                       utype=None,
+                       ucd=_or_none(column.ucd),
+                       unit=_or_none(column.unit),
+                       description=_or_none(column.description),
+                       datatype=datatype,
+                       arraysize=arraysize,
+                       xtype=xtype,
+                       size=None,
+                       principal=0,
+                       indexed=0,
+                       std=0,
+                       column_index=None if column.ordinal is None
+                       else column.ordinal + 1)
+
+
+def plan_refresh(schemas, exported_versions, full=False):
+    """Find the schemas to write to TAP_SCHEMA.
+
+    :param schemas: sequence of snapshot `Schema` records
+    :param exported_versions: dict mapping the names of the exported
+    schemas to their recorded version
+    :param full: whether all the schemas are rewritten, even unchanged
+    ones
+
+    Returns a (<schemas to write>, <names of schemas to delete>) tuple.
+    The rows of every schema to write must be deleted first.
+    """
+    stale = [schema for schema in schemas
+             if full or
+             exported_versions.get(schema.name) != schema_version(schema)]
+    names = set(schema.name for schema in schemas)
+    removed = sorted(name for name in exported_versions if name not in names)
+    return stale, removed
+
+
+def _element(name, value, indent):
+    if not value:
+        return ""
+    return "%s<%s>%s</%s>\n" % (indent, name, escape(value), name)
+
+
+def _vosi_column(column):
+    datatype, arraysize, xtype = column_datatype(column.datatype,
+                                                 column.arraysize)
+    attributes = ""
+    if arraysize:
+        attributes += " arraysize=%s" % quoteattr(arraysize)
+    if xtype:
+        attributes += " xtype=%s" % quoteattr(xtype)
+    parts = ["      <column>\n",
+             _element("name", column.name, "        "),
+             _element("description", column.description, "        "),
+             _element("unit", column.unit, "        "),
+             _element("ucd", column.ucd, "        "),
+             '        <dataType xsi:type="vs:VOTableType"%s>%s</dataType>\n'
+             % (attributes, escape(datatype or "char"))]
+    if column.nullable:
+        parts.append("        <flag>nullable</flag>\n")
+    parts.append("      </column>\n")
+    return "".join(parts)
+
+
+def vosi_tables(schemas):
+    """Yield a VOSI tableset document describing schemas, one chunk per
+    table."""
+    yield VOSI_HEADER
+    for schema in schemas:
+        yield "  <schema>\n%s%s" % (
+            _element("name", schema.name, "    "),
+            _element("description", schema.description, "    "))
+        for table in schema.tables:
+            yield '    <table type="output">\n%s%s%s    </table>\n' % (
+                _element("name", table_name(schema, table), "      "),
+                _element("description", table.description, "      "),
+                "".join(_vosi_column(column) for column in table.columns))
+        yield "  </schema>\n"
+    yield VOSI_FOOTER
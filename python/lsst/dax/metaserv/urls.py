@@ -0,0 +1,108 @@
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Templates of the external URLs of the API resources.
+
+Building a URL with Flask's `url_for` matches the endpoint against the
+URL map and quotes every argument. The URLs of the databases, schemas
+and tables only differ by an integer id, so the URL of an endpoint is
+built once with a marker in place of the id, and ids are then filled
+in by joining the parts around the marker. Since an integer is never
+quoted, the result is the same URL.
+
+Templates depend on the external URL root (scheme, host and script
+root) of the requests, and are kept in one `UrlTemplates` per root.
+"""
+
+import threading
+
+#: Stands for the id when building templates
+ID_MARKER = "__metaserv_id__"
+
+
+class UrlTemplates(object):
+    """URL templates of one URL root.
+
+    As the fixed arguments may come from the request path, e.g. a
+    schema given by name, at most `max_templates` templates are kept:
+    all are dropped when a new one exceeds that.
+
+    :param build: function building an external URL from an endpoint
+    and its arguments, e.g. `url_for` with `_external=True`, called
+    once per endpoint and fixed arguments.
+    """
+
+    def __init__(self, build, max_templates=1024):
+        self._build = build
+        self.max_templates = max_templates
+        self._templates = {}
+
+    def url(self, endpoint, id_name, id_value, **values):
+        """Return the URL of `endpoint` with `id_name` set to
+        `id_value` and the other arguments set to `values`."""
+        if not isinstance(id_value, int):
+            values[id_name] = id_value
+            return self._build(endpoint, **values)
+        key = (endpoint, id_name) + tuple(sorted(values.items()))
+        template = self._templates.get(key)
+        if template is None:
+            values[id_name] = ID_MARKER
+            template = self._build(endpoint, **values).split(ID_MARKER)
+            if len(template) != 2:
+                # The marker was altered or appears in a value
+                template = ()
+            if len(self._templates) >= self.max_templates:
+                self._templates = {}
+            self._templates[key] = template
+        if not template:
+            values[id_name] = id_value
+            return self._build(endpoint, **values)
+        return str(id_value).join(template)
+
+
+class UrlTemplateCache(object):
+    """`UrlTemplates` of the URL roots requests came through.
+
+    As URL roots come from the Host header of requests, at most
+    `max_roots` roots are kept: all are dropped when a new one exceeds
+    that.
+
+    :param build: function building an external URL, as for
+    `UrlTemplates`
+    """
+
+    def __init__(self, build, max_roots=16):
+        self._build = build
+        self.max_roots = max_roots
+        self._roots = {}
+        self._lock = threading.Lock()
+
+    def get(self, url_root):
+        """Return the `UrlTemplates` of a URL root."""
+        templates = self._roots.get(url_root)
+        if templates is None:
+            with self._lock:
+                if len(self._roots) >= self.max_roots:
+                    self._roots = {}
+                templates = self._roots.setdefault(
+                    url_root, UrlTemplates(self._build))
+        return templates
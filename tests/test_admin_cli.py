@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the ingest of admin_cli.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from click.testing import CliRunner
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from lsst.dax.metaserv import model
+    from lsst.dax.metaserv.admin_cli import CliConfig, Operations, \
+        _insert_batches, add_dbs
+except ImportError:
+    Operations = None
+
+
+def _parsed_schema(table_count, column_count):
+    return OrderedDict(
+        ("T%d" % table, {
+            "description": "Table %d." % table,
+            "columns": [{"name": "c%d" % column, "datatype": "int",
+                         "nullable": True}
+                        for column in range(column_count)]})
+        for table in range(table_count))
+
+
+@unittest.skipIf(Operations is None, "admin_cli dependencies not available")
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        model.init_db(self.engine)
+        self.session = model.session_maker(self.engine)()
+        self.addCleanup(self.session.close)
+
+    def ingest(self, parsed_schema, batch_size):
+        """Ingest a schema in a fresh database and return its tables
+        and columns."""
+        self.session.close()
+        self.setUp()
+        database = Operations.add_database(self.session, model.MSRepo(),
+                                           "sdss", None, None)
+        schema = Operations.add_schema(self.session, database, "s1")
+        rows = Operations.add_tables_and_columns(
+            self.session, schema, iter(parsed_schema.items()), batch_size)
+        self.session.commit()
+        tables = self.session.query(
+            model.MSDatabaseTable.id, model.MSDatabaseTable.schema_id,
+            model.MSDatabaseTable.name,
+            model.MSDatabaseTable.description).order_by(
+            model.MSDatabaseTable.id).all()
+        columns = self.session.query(
+            model.MSDatabaseColumn.id, model.MSDatabaseColumn.table_id,
+            model.MSDatabaseColumn.name,
+            model.MSDatabaseColumn.ordinal).order_by(
+            model.MSDatabaseColumn.id).all()
+        self.assertEqual(rows, len(tables) + len(columns))
+        return tables, columns
+
+    def test_insert_batches(self):
+        """
+        Every row is inserted once, whether the last batch is full or
+        not.
+        """
+        table = model.MSUser.__table__
+        for batch_size in (1, 2, 3, 4, 6, 7):
+            self.session.execute(table.delete())
+            rows = [dict(email="user%d" % i) for i in range(6)]
+            self.assertEqual(_insert_batches(self.session, model.MSUser,
+                                             iter(rows), batch_size), 6)
+            self.assertEqual(
+                [row.email for row in self.session.query(
+                    model.MSUser.email).order_by(model.MSUser.id)],
+                ["user%d" % i for i in range(6)])
+        self.assertEqual(_insert_batches(self.session, model.MSUser, [], 2),
+                         0)
+
+    def test_batch_boundaries(self):
+        """
+        Batched ingests give the same ids and ordinals as an unbatched
+        one, with full and partial last batches of tables and columns.
+        """
+        parsed_schema = _parsed_schema(4, 3)
+        tables, columns = self.ingest(parsed_schema, 1000)
+        self.assertEqual(len(tables), 4)
+        self.assertEqual([(column.name, column.ordinal)
+                          for column in columns if column.table_id == 4],
+                         [("c0", 0), ("c1", 1), ("c2", 2)])
+        # 4 tables of 3 columns: 2 and 4 divide every batch, 3 leaves a
+        # partial batch of tables and 5 one of tables and columns.
+        for batch_size in (1, 2, 3, 4, 5):
+            self.assertEqual(self.ingest(parsed_schema, batch_size),
+                             (tables, columns), batch_size)
+
+
+@unittest.skipIf(Operations is None, "admin_cli dependencies not available")
+class TestAddDbs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        engine = create_engine("sqlite:///" +
+                               os.path.join(self.tmp_dir, "metaserv.db"))
+        model.init_db(engine)
+        # The group callback reads the engine from a config file
+        self.config = CliConfig.__new__(CliConfig)
+        self.config.engine = engine
+        self.config.schema_cache = None
+        self.config.Session = sessionmaker(engine)
+        session = self.config.Session()
+        session.add(model.MSUser(email="owner@lsst.org"))
+        session.commit()
+        session.close()
+
+        self.schema_file = self.write("schema.sql", """
+CREATE TABLE Object
+    -- <descr>Objects.</descr>
+(
+    id BIGINT NOT NULL,
+    ra DOUBLE,
+        -- <ucd>pos.eq.ra</ucd>
+        -- <unit>deg</unit>
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE Source
+(
+    id BIGINT NOT NULL,
+    objectId BIGINT
+);
+""")
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def add_dbs(self, entries, *args):
+        manifest = self.write("manifest.json", json.dumps(entries))
+        return CliRunner().invoke(add_dbs, [manifest] + list(args),
+                                  obj=self.config)
+
+    def entry(self, db_name, schema_file=None):
+        return dict(schema_file=schema_file or self.schema_file,
+                    db_name=db_name, host="localhost", port=3306,
+                    schema_name=db_name, schema_version="1",
+                    schema_description="", owner="owner@lsst.org")
+
+    def test_add_dbs(self):
+        """
+        All the databases of the manifest are added, sharing the parsed
+        schema file, and failures are reported without stopping the
+        others.
+        """
+        result = self.add_dbs([self.entry("sdss"), self.entry("wise")],
+                              "--jobs", "2", "--batch-size", "1")
+        self.assertEqual(result.exit_code, 0, result.output)
+        session = self.config.Session()
+        self.addCleanup(session.close)
+        self.assertEqual(sorted(name for name, in session.query(
+            model.MSDatabase.name)), ["sdss", "wise"])
+        self.assertEqual(session.query(model.MSDatabaseTable).count(), 4)
+        self.assertEqual(session.query(model.MSDatabaseColumn).count(), 8)
+        self.assertEqual(model.current_generation(session), 2)
+
+        missing = os.path.join(self.tmp_dir, "missing.sql")
+        result = self.add_dbs([self.entry("sdss"), self.entry("gaia"),
+                               self.entry("hsc", missing)])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("2 of 3 databases could not be added", result.output)
+        self.assertEqual(sorted(name for name, in session.query(
+            model.MSDatabase.name)), ["gaia", "sdss", "wise"])
+
+    def test_jobs(self):
+        """
+        At least one job is needed.
+        """
+        for jobs in ("0", "-1"):
+            result = self.add_dbs([self.entry("sdss")], "--jobs", jobs)
+            self.assertEqual(result.exit_code, 2, result.output)
+            self.assertIn("--jobs", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
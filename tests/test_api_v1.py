@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the routes of the v1 API, served from an
+in-memory SQLite metaserv database.
+"""
+
+import json
+import unittest
+from unittest import mock
+
+try:
+    from flask import Flask
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from lsst.dax.metaserv import api_v1, model
+    from lsst.dax.metaserv.api_v1 import meta_api_v1
+except ImportError:
+    meta_api_v1 = None
+
+PREFIX = "/api/meta/v1"
+
+
+@unittest.skipIf(meta_api_v1 is None,
+                 "Flask, SQLAlchemy, marshmallow or lsst.log is not "
+                 "available")
+class ApiTestCase(unittest.TestCase):
+    """Serves database sdss, with tables T0 to T4 in its default schema
+    s1 and table T0 in schema s2. Every table has columns c0 and c1."""
+
+    def setUp(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool,
+                               connect_args={"check_same_thread": False})
+        model.init_db(engine)
+        self.session = model.session_maker(engine)()
+        self.addCleanup(self.session.close)
+        database = model.MSDatabase(name="sdss", conn_host="localhost",
+                                    conn_port=3306)
+        self.session.add(database)
+        self.session.flush()
+        for name, table_count in (("s1", 5), ("s2", 1)):
+            schema = model.MSDatabaseSchema(db_id=database.id, name=name,
+                                            is_default_schema=name == "s1")
+            self.session.add(schema)
+            self.session.flush()
+            for index in range(table_count):
+                table = model.MSDatabaseTable(
+                    schema_id=schema.id, name="T%d" % index,
+                    description="Table %d of %s." % (index, name))
+                self.session.add(table)
+                self.session.flush()
+                for ordinal in range(2):
+                    self.session.add(model.MSDatabaseColumn(
+                        table_id=table.id, name="c%d" % ordinal,
+                        ordinal=ordinal, datatype="double",
+                        ucd="pos.eq.ra", unit="deg", nullable=True))
+        model.bump_generation(self.session)
+        self.session.commit()
+
+        app = Flask(__name__)
+        app.config["default_engine"] = engine
+        app.config["dax.metaserv.snapshot.check_interval"] = 0
+        app.register_blueprint(meta_api_v1, url_prefix=PREFIX)
+        self.app = app
+        self.client = app.test_client()
+
+    def get(self, path, **kwargs):
+        return self.client.get(PREFIX + path, **kwargs)
+
+
+class TestConditionalRequests(ApiTestCase):
+
+    def test_if_none_match(self):
+        """
+        A matching ETag is answered with 304.
+        """
+        response = self.get("/db/sdss/tables/")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        response = self.get("/db/sdss/tables/",
+                            headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        response = self.get("/db/sdss/tables/",
+                            headers={"If-None-Match": '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """
+        An unmodified resource is answered with 304.
+        """
+        response = self.get("/db/sdss/")
+        last_modified = response.headers["Last-Modified"]
+        response = self.get("/db/sdss/",
+                            headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+        response = self.get("/db/sdss/", headers={
+            "If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_modified(self):
+        """
+        A change of the metadata changes the ETag.
+        """
+        etag = self.get("/db/sdss/tables/").headers["ETag"]
+        table = self.session.query(model.MSDatabaseTable).first()
+        table.description = "Changed."
+        model.bump_generation(self.session)
+        self.session.commit()
+        response = self.get("/db/sdss/tables/",
+                            headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+
+class TestTables(ApiTestCase):
+
+    def tables(self, query="", status=200):
+        response = self.get("/db/sdss/tables/" + query)
+        self.assertEqual(response.status_code, status)
+        return response.get_json()
+
+    def test_all(self):
+        """
+        All the tables of the default schema are returned, with their
+        columns.
+        """
+        results = self.tables()["results"]
+        self.assertEqual(results["schema"]["name"], "s1")
+        self.assertEqual([table["name"] for table in results["tables"]],
+                         ["T0", "T1", "T2", "T3", "T4"])
+        self.assertEqual([column["name"]
+                          for column in results["tables"][0]["columns"]],
+                         ["c0", "c1"])
+        self.assertNotIn("total", results)
+        results = self.get("/db/sdss/s2/tables/").get_json()["results"]
+        self.assertEqual([table["name"] for table in results["tables"]],
+                         ["T0"])
+
+    def test_fields(self):
+        """
+        Only the requested fields are returned.
+        """
+        tables = self.tables("?fields=name,id")["results"]["tables"]
+        self.assertEqual(sorted(tables[0]), ["id", "name"])
+        tables = self.tables("?fields=name,name")["results"]["tables"]
+        self.assertEqual(tables[0], {"name": "T0"})
+        self.tables("?fields=name,unknown", 400)
+        self.tables("?fields=,", 400)
+
+    def test_paging(self):
+        """
+        Tables are paged with limit and offset, and counted.
+        """
+        results = self.tables("?fields=name&limit=2&offset=1")["results"]
+        self.assertEqual(results["tables"], [{"name": "T1"}, {"name": "T2"}])
+        self.assertEqual(results["total"], 5)
+        results = self.tables("?fields=name&offset=4")["results"]
+        self.assertEqual(results["tables"], [{"name": "T4"}])
+        results = self.tables("?fields=name&limit=10&offset=3")["results"]
+        self.assertEqual(len(results["tables"]), 2)
+        results = self.tables("?offset=5")["results"]
+        self.assertEqual((results["tables"], results["total"]), ([], 5))
+        results = self.tables("?limit=0")["results"]
+        self.assertEqual((results["tables"], results["total"]), ([], 5))
+
+    def test_invalid(self):
+        """
+        Invalid paging values and unknown databases are rejected.
+        """
+        for query in ("?limit=-1", "?offset=-1", "?limit=x", "?offset=1.5"):
+            self.tables(query, 400)
+        self.assertEqual(self.get("/db/unknown/tables/").status_code, 404)
+        self.assertEqual(self.get("/db/sdss/s3/tables/").status_code, 404)
+
+
+class TestTableBatch(ApiTestCase):
+
+    def batch(self, tables, status=200):
+        query = "&".join("table=%s" % table for table in tables)
+        response = self.get("/db/sdss/batch/tables/?" + query)
+        self.assertEqual(response.status_code, status)
+        return response.get_json()
+
+    def test_get(self):
+        """
+        Tables of any schema are returned in the order of the request,
+        unknown ones are listed as missing.
+        """
+        body = self.batch(["T1", "s2.T0", "T0", "s1.T9", "6", "s2.5",
+                           "s3.T0"])
+        self.assertEqual([(table["id"], table["description"])
+                          for table in body["results"]],
+                         [(2, "Table 1 of s1."), (6, "Table 0 of s2."),
+                          (1, "Table 0 of s1.")])
+        self.assertEqual([column["name"]
+                          for column in body["results"][0]["columns"]],
+                         ["c0", "c1"])
+        self.assertEqual(body["missing"], ["s1.T9", "6", "s2.5", "s3.T0"])
+        body = self.batch(["T0", "T0"])
+        self.assertEqual(len(body["results"]), 2)
+        self.assertEqual(body["missing"], [])
+
+    def test_post(self):
+        """
+        Tables are also read from a JSON body, which is not cached.
+        """
+        response = self.client.post(PREFIX + "/db/sdss/batch/tables/",
+                                    json={"tables": ["s2.T0", "T9"]})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual([table["id"] for table in body["results"]], [6])
+        self.assertEqual(body["missing"], ["T9"])
+        self.assertNotIn("ETag", response.headers)
+        for payload in ({"tables": []}, {"tables": "T0"}, ["T0"], {}):
+            response = self.client.post(PREFIX + "/db/sdss/batch/tables/",
+                                        json=payload)
+            self.assertEqual(response.status_code, 400, payload)
+
+    def test_limits(self):
+        """
+        Empty and oversized batches are rejected.
+        """
+        self.batch([], 400)
+        self.app.config["dax.metaserv.batch.max_tables"] = 3
+        self.batch(["T0", "T1", "T2"])
+        self.batch(["T0", "T1", "T2", "T3"], 400)
+        response = self.get("/db/unknown/batch/tables/?table=T0")
+        self.assertEqual(response.status_code, 404)
+
+
+class TestStreaming(ApiTestCase):
+
+    def test_same_body(self):
+        """
+        Streamed responses hold the same JSON as buffered ones.
+        """
+        for query in ("", "?fields=name,id", "?limit=2&offset=1",
+                      "?offset=9"):
+            expected = self.get("/db/sdss/tables/" + query).get_json()
+            separator = "&" if query else "?"
+            response = self.get("/db/sdss/tables/" + query + separator +
+                                "stream=true")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(json.loads(response.get_data(as_text=True)),
+                             expected, query)
+
+    def test_small_chunks(self):
+        """
+        Items are split across chunks without changing the body.
+        """
+        expected = self.get("/db/sdss/tables/").get_json()
+        json_stream = api_v1._json_stream
+
+        def small_chunks(before, items, after):
+            return json_stream(before, items, after, buffer_size=1)
+        with mock.patch.object(api_v1, "_json_stream", small_chunks):
+            response = self.get("/db/sdss/tables/?stream=true",
+                                buffered=False)
+            chunks = list(response.response)
+            response.close()
+        # The head, one chunk per table and the tail
+        self.assertEqual(len(chunks), len(expected["results"]["tables"]) + 2)
+        self.assertEqual(json.loads(b"".join(chunks).decode("utf-8")),
+                         expected)
+
+    def test_failure(self):
+        """
+        An error while streaming reaches the server once the first chunk
+        is sent, and the request is still recorded.
+        """
+        def failing_dumps(dump, items):
+            for index, item in enumerate(items):
+                if index == 1:
+                    raise RuntimeError("Serialization failed")
+                yield dump(item)
+        with mock.patch.object(api_v1, "_timed_dumps", failing_dumps):
+            response = self.get("/db/sdss/tables/?stream=true",
+                                buffered=False)
+            self.assertEqual(response.status_code, 200)
+            chunks = iter(response.response)
+            self.assertTrue(next(chunks).startswith(b'{"results":'))
+            self.assertRaises(RuntimeError, next, chunks)
+            response.close()
+        metrics = self.app.extensions["metaserv_metrics"]
+        self.assertEqual(metrics.requests.value(
+            (meta_api_v1.name + ".tables", "GET", "200")), 1)
+        # Nothing was cached from the failed response
+        response = self.get("/db/sdss/tables/")
+        self.assertEqual(len(response.get_json()["results"]["tables"]), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
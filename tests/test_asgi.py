@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the AsyncMetaServer ASGI application.
+"""
+
+import asyncio
+import unittest
+
+from lsst.dax.metaserv.asgi import AsyncMetaServer
+
+
+class Abort(BaseException):
+    pass
+
+
+def wsgi_app(environ, start_response):
+    if environ["PATH_INFO"] == "/fail":
+        raise RuntimeError("failed")
+    if environ["PATH_INFO"] == "/abort":
+        raise Abort()
+    start_response("200 OK", [("Content-Type", "application/json"),
+                              ("X-Query", environ["QUERY_STRING"]),
+                              ("X-Accept", environ.get("HTTP_ACCEPT", ""))])
+    body = environ["wsgi.input"].read()
+    return [b'{"path": "', environ["PATH_INFO"].encode("latin-1"), b'"',
+            b', "body": "', body, b'"}']
+
+
+def call(app, path, query_string=b"", body=b""):
+    scope = {"type": "http", "method": "GET", "path": path,
+             "query_string": query_string, "http_version": "1.1",
+             "headers": [(b"accept", b"application/json")],
+             "server": ("localhost", 5000), "client": ("127.0.0.1", 1234)}
+    received = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(
+            asyncio.wait_for(app(scope, receive, send), 10))
+    finally:
+        loop.close()
+    return sent
+
+
+class TestAsyncMetaServer(unittest.TestCase):
+
+    def setUp(self):
+        self.app = AsyncMetaServer(wsgi_app, max_workers=2)
+
+    def tearDown(self):
+        self.app.executor.shutdown()
+
+    def test_request(self):
+        """
+        The WSGI response is sent back in chunks.
+        """
+        sent = call(self.app, "/db/", b"fields=name", b"x")
+        self.assertEqual(sent[0]["type"], "http.response.start")
+        self.assertEqual(sent[0]["status"], 200)
+        headers = dict(sent[0]["headers"])
+        self.assertEqual(headers[b"x-query"], b"fields=name")
+        self.assertEqual(headers[b"x-accept"], b"application/json")
+        body = b"".join(message["body"] for message in sent[1:])
+        self.assertEqual(body, b'{"path": "/db/", "body": "x"}')
+        self.assertTrue(sent[1]["more_body"])
+        self.assertFalse(sent[-1].get("more_body", False))
+
+    def test_error(self):
+        """
+        Exceptions are turned into 500 responses.
+        """
+        sent = call(self.app, "/fail")
+        self.assertEqual(sent[0]["status"], 500)
+
+    def test_abort(self):
+        """
+        Other exceptions of the worker thread are raised, not waited on.
+        """
+        self.assertRaises(Abort, call, self.app, "/abort")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the ColumnStore class.
+"""
+
+import unittest
+
+from lsst.dax.metaserv.column_store import Column, ColumnStore
+
+
+class TestColumnStore(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [
+            Column(1, 10, "id", "the t1.id", 0, "meta.id", "", "int",
+                   False, None),
+            Column(2, 10, "ra", "right asc", 1, "pos.eq.ra", "deg",
+                   "double", True, None),
+            Column(3, 11, "ra", None, 0, "pos.eq.ra", "deg", "double",
+                   None, 8),
+        ]
+        self.store = ColumnStore()
+        self.store.extend(self.rows)
+
+    def test_roundtrip(self):
+        """
+        Columns read back from the store are identical to the input.
+        """
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(list(self.store), self.rows)
+        self.assertEqual(self.store[-1], self.rows[-1])
+        self.assertEqual(self.store[1:], self.rows[1:])
+
+    def test_interning(self):
+        """
+        Repeated strings are stored once.
+        """
+        self.assertEqual(self.store.strings.count("pos.eq.ra"), 1)
+        self.assertEqual(self.store.strings.count("deg"), 1)
+        self.assertEqual(self.store.strings.count("ra"), 1)
+
+    def test_table_columns(self):
+        """
+        Tables see their own range of columns.
+        """
+        self.assertEqual(list(self.store.table_columns(10)), self.rows[:2])
+        self.assertEqual(list(self.store.table_columns(11)), self.rows[2:])
+        self.assertEqual(len(self.store.table_columns(12)), 0)
+        columns = self.store.table_columns(10)
+        self.assertEqual(columns[-1], self.rows[1])
+        self.assertRaises(IndexError, columns.__getitem__, 2)
+        self.assertEqual(repr(columns), repr(tuple(self.rows[:2])))
+
+    def test_not_contiguous(self):
+        """
+        Columns of a table must be appended together.
+        """
+        self.assertRaises(ValueError, self.store.append, *self.rows[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the FacetIndex class.
+"""
+
+from collections import namedtuple
+import unittest
+
+from lsst.dax.metaserv.facets import FacetIndex, ucd_branches, ucd_words
+
+Database = namedtuple("Database", ["id", "schemas"])
+Schema = namedtuple("Schema", ["tables"])
+Table = namedtuple("Table", ["columns"])
+Column = namedtuple("Column", ["id", "ucd", "unit"])
+
+
+class TestFacetIndex(unittest.TestCase):
+
+    def setUp(self):
+        columns = [Column(1, "meta.id;src", ""),
+                   Column(2, "pos.eq.ra;meta.main", "deg"),
+                   Column(3, "pos.eq.dec;meta.main", "deg"),
+                   Column(4, "pos.galactic.lon", "deg"),
+                   Column(5, None, None)]
+        other = [Column(6, "pos.eq.ra", "rad")]
+        self.index = FacetIndex([
+            Database(1, [Schema([Table(columns)])]),
+            Database(2, [Schema([Table(other)])])])
+
+    def test_words(self):
+        """
+        UCDs are split into words and branches.
+        """
+        self.assertEqual(ucd_words("pos.eq.ra; Meta.Main"),
+                         ["pos.eq.ra", "meta.main"])
+        self.assertEqual(ucd_words(None), [])
+        self.assertEqual(ucd_branches("pos.eq.ra"),
+                         ["pos", "pos.eq", "pos.eq.ra"])
+
+    def test_counts(self):
+        """
+        Counts are per database and per level of the hierarchy.
+        """
+        self.assertEqual(self.index.counts(1, "ucd"),
+                         [("meta", 3), ("pos", 3), ("src", 1)])
+        self.assertEqual(self.index.counts(1, "ucd", "pos"),
+                         [("pos.eq", 2), ("pos.galactic", 1)])
+        self.assertEqual(self.index.counts(1, "ucd", "pos.eq"),
+                         [("pos.eq.dec", 1), ("pos.eq.ra", 1)])
+        self.assertEqual(self.index.counts(1, "unit"), [("deg", 3)])
+        self.assertEqual(self.index.counts(2, "unit"), [("rad", 1)])
+        self.assertEqual(self.index.counts(3, "unit"), [])
+
+    def test_column_ids(self):
+        """
+        Columns are selected by word, branch or unit.
+        """
+        self.assertEqual(self.index.column_ids("ucd", "pos.eq.*"),
+                         set([2, 3, 6]))
+        self.assertEqual(self.index.column_ids("ucd", "pos.eq.ra"),
+                         set([2, 6]))
+        self.assertEqual(self.index.column_ids("ucd", "pos.eq"), set())
+        self.assertEqual(self.index.column_ids("unit", "deg"),
+                         set([2, 3, 4]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the Prometheus metrics.
+"""
+
+import unittest
+
+from lsst.dax.metaserv.metrics import Counter, Histogram, Registry, \
+    RequestMetrics, RequestStats
+
+try:
+    from flask import Flask, g
+    from lsst.dax.metaserv import api_v1
+except ImportError:
+    api_v1 = None
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counter(self):
+        """
+        Counters are kept per label values, which are escaped.
+        """
+        counter = Counter("requests_total", "Requests.", ("endpoint",))
+        counter.inc(("tables",))
+        counter.inc(("tables",), 2)
+        counter.inc(('a"b',))
+        self.assertEqual(counter.value(("tables",)), 3)
+        self.assertEqual(list(counter.samples()),
+                         ['requests_total{endpoint="a\\"b"} 1',
+                          'requests_total{endpoint="tables"} 3'])
+
+    def test_histogram(self):
+        """
+        Buckets are cumulative, and include their upper bound.
+        """
+        histogram = Histogram("size", "Sizes.", buckets=(1, 10))
+        for value in (0.5, 1, 5, 100):
+            histogram.observe(value)
+        self.assertEqual(histogram.count(), 4)
+        self.assertEqual(list(histogram.samples()),
+                         ['size_bucket{le="1"} 2',
+                          'size_bucket{le="10"} 3',
+                          'size_bucket{le="+Inf"} 4',
+                          'size_sum 106.5',
+                          'size_count 4'])
+
+    def test_render(self):
+        """
+        Metrics are rendered with their help and type.
+        """
+        registry = Registry()
+        registry.add(Counter("hits", "Cache hits.")).inc()
+        self.assertEqual(registry.render(),
+                         "# HELP hits Cache hits.\n"
+                         "# TYPE hits counter\n"
+                         "hits 1\n")
+
+    def test_request_metrics(self):
+        """
+        Request stats are recorded per endpoint.
+        """
+        metrics = RequestMetrics()
+        stats = RequestStats()
+        stats.sql_queries = 3
+        stats.response_size = 2000
+        metrics.record("api.tables", "GET", "200", 0.02, stats)
+        metrics.record("api.tables", "GET", "304", 0.001, RequestStats())
+        self.assertEqual(metrics.requests.value(("api.tables", "GET", "200")),
+                         1)
+        self.assertEqual(metrics.latency.count(("api.tables",)), 2)
+        text = metrics.render()
+        self.assertIn('metaserv_request_sql_queries_sum'
+                      '{endpoint="api.tables"} 3', text)
+        self.assertIn('metaserv_response_size_bytes_bucket'
+                      '{endpoint="api.tables",le="4096"} 2', text)
+
+    @unittest.skipIf(api_v1 is None, "Flask or lsst.log is not available")
+    def test_streamed_stats(self):
+        """
+        Streamed responses are timed after the request stats left g.
+        """
+        app = Flask(__name__)
+        with app.test_request_context("/"):
+            stats = g._metrics_stats = RequestStats()
+            response = api_v1._json_stream(
+                '{"results": ', api_v1._timed_dumps(
+                    lambda i: {"id": i, "name": "table %d" % i}, range(1000)),
+                "}")
+            # As in the after_request hook
+            g.pop("_metrics_stats")
+        body = b"".join(response.iter_encoded())
+        self.assertTrue(body.endswith(b"}]}"))
+        self.assertGreater(stats.serialize_time, 0)
+        self.assertGreater(stats.encode_time, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the creation and upgrade of the metaserv
+database.
+"""
+
+import unittest
+
+try:
+    from sqlalchemy import MetaData, create_engine, inspect
+    from lsst.dax.metaserv import model
+except ImportError:
+    model = None
+
+UNIQUE_INDEXES = ["uq_MSDatabaseColumn_table_id_ordinal",
+                  "uq_MSDatabaseSchema_db_id_name",
+                  "uq_MSDatabaseTable_schema_id_name",
+                  "uq_MSDatabase_name"]
+
+
+def _create_baseline(engine):
+    """Create the tables of the first metaserv schema, which had no
+    unique indexes, generation or TAP export tables."""
+    metadata = MetaData()
+    for table in model.Base.metadata.sorted_tables:
+        if table.name not in ("MSGeneration", "MSTapExport"):
+            table.tometadata(metadata).indexes.clear()
+    metadata.create_all(engine)
+
+
+@unittest.skipIf(model is None, "SQLAlchemy is not available")
+class TestUpgrade(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+
+    def indexes(self):
+        inspector = inspect(self.engine)
+        return sorted(index["name"]
+                      for table in inspector.get_table_names()
+                      for index in inspector.get_indexes(table)
+                      if index["unique"])
+
+    def generations(self):
+        table = model.MSGeneration.__table__
+        return [tuple(row) for row in self.engine.execute(
+            table.select().with_only_columns(
+                [table.c.id, table.c.generation]))]
+
+    def test_upgrade(self):
+        """
+        Upgrading the baseline schema creates the missing tables and
+        indexes and seeds the generation row, and a second upgrade
+        changes nothing.
+        """
+        _create_baseline(self.engine)
+        self.engine.execute(model.MSDatabase.__table__.insert(),
+                            dict(id=1, name="sdss"))
+        self.assertEqual(self.indexes(), [])
+
+        self.assertEqual(sorted(model.upgrade_db(self.engine)),
+                         UNIQUE_INDEXES)
+        self.assertEqual(self.indexes(), UNIQUE_INDEXES)
+        self.assertTrue({"MSGeneration", "MSTapExport"}.issubset(
+            inspect(self.engine).get_table_names()))
+        self.assertEqual(self.generations(), [(model.GENERATION_ID, 0)])
+
+        session = model.session_maker(self.engine)()
+        self.addCleanup(session.close)
+        self.assertEqual(model.bump_generation(session), 1)
+        session.commit()
+        self.assertEqual(model.upgrade_db(self.engine), [])
+        self.assertEqual(self.indexes(), UNIQUE_INDEXES)
+        self.assertEqual(self.generations(), [(model.GENERATION_ID, 1)])
+        self.assertEqual(session.query(model.MSDatabase.name).all(),
+                         [("sdss",)])
+
+    def test_merge_generations(self):
+        """
+        Generation rows left by older versions are merged into the
+        seeded one.
+        """
+        model.Base.metadata.create_all(self.engine)
+        self.engine.execute(model.MSGeneration.__table__.insert(), [
+            dict(id=2, generation=3), dict(id=3, generation=5)])
+        model.upgrade_db(self.engine)
+        self.assertEqual(self.generations(), [(model.GENERATION_ID, 5)])
+
+    def test_init(self):
+        """
+        A new database needs no upgrade.
+        """
+        model.init_db(self.engine)
+        self.assertEqual(self.indexes(), UNIQUE_INDEXES)
+        self.assertEqual(self.generations(), [(model.GENERATION_ID, 0)])
+        self.assertEqual(model.upgrade_db(self.engine), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the ResponseCache class.
+"""
+
+import gzip
+import unittest
+
+from lsst.dax.metaserv.response_cache import ResponseCache, make_entry
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_lru(self):
+        """
+        Least recently used entries are evicted first.
+        """
+        cache = ResponseCache(max_bytes=30)
+        cache.validate(1)
+        cache.put("a", make_entry(b"a" * 10, "application/json"))
+        cache.put("b", make_entry(b"b" * 10, "application/json"))
+        cache.put("c", make_entry(b"c" * 10, "application/json"))
+        self.assertEqual(cache.size, 30)
+        cache.get("a")
+        cache.put("d", make_entry(b"d" * 10, "application/json"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.size, 30)
+
+        # Too large to be cached at all
+        cache.put("e", make_entry(b"e" * 31, "application/json"))
+        self.assertIsNone(cache.get("e"))
+        self.assertEqual(len(cache), 3)
+
+    def test_generation(self):
+        """
+        Entries are dropped when the generation changes.
+        """
+        cache = ResponseCache(max_bytes=100)
+        cache.validate(1)
+        cache.put("a", make_entry(b"a", "application/json"))
+        cache.validate(1)
+        self.assertIsNotNone(cache.get("a"))
+        cache.validate(2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size, 0)
+
+    def test_gzip(self):
+        """
+        Only bodies above the threshold are compressed.
+        """
+        body = b'{"results": []}' * 100
+        entry = make_entry(body, "application/json", gzip_min_size=1000)
+        self.assertEqual(gzip.decompress(entry.gzip_body), body)
+        entry = make_entry(b"{}", "application/json", gzip_min_size=1000)
+        self.assertIsNone(entry.gzip_body)
+        entry = make_entry(body, "application/json")
+        self.assertIsNone(entry.gzip_body)
+
+
+if __name__ == "__main__":
+    unittest.main()
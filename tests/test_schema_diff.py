@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for diff_schema.
+"""
+
+import unittest
+
+from lsst.dax.metaserv.schema_diff import column_values, diff_schema
+
+
+def _stored(table_id, description, columns, first_column_id):
+    stored_columns = []
+    for ordinal, column in enumerate(columns):
+        values = column_values(column, ordinal)
+        values["id"] = first_column_id + ordinal
+        # MySQL returns booleans as integers
+        values["nullable"] = int(values["nullable"])
+        stored_columns.append(values)
+    return dict(id=table_id, description=description, columns=stored_columns)
+
+
+class TestSchemaDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.parsed = {
+            "t1": {"description": "This is t1 table.",
+                   "columns": [{"name": "id", "datatype": "int",
+                                "nullable": False},
+                               {"name": "ra", "datatype": "double",
+                                "ucd": "pos.eq.ra", "unit": "deg",
+                                "nullable": True}]},
+            "t2": {"description": "This is t2 table.",
+                   "columns": [{"name": "id2", "datatype": "int",
+                                "nullable": True}]},
+        }
+
+    def test_unchanged(self):
+        """
+        Nothing to do for an identical schema.
+        """
+        stored = {
+            "t1": _stored(1, "This is t1 table.",
+                          self.parsed["t1"]["columns"], 10),
+            "t2": _stored(2, "This is t2 table.",
+                          self.parsed["t2"]["columns"], 20),
+        }
+        self.assertFalse(any(diff_schema(stored, self.parsed)))
+
+    def test_null_text(self):
+        """
+        NULL text fields match missing ones.
+        """
+        del self.parsed["t1"]["description"]
+        stored = {
+            "t1": _stored(1, None, self.parsed["t1"]["columns"], 10),
+            "t2": _stored(2, "This is t2 table.",
+                          self.parsed["t2"]["columns"], 20),
+        }
+        for column in stored["t1"]["columns"] + stored["t2"]["columns"]:
+            for field in ("description", "ucd", "unit"):
+                if not column[field]:
+                    column[field] = None
+        self.assertFalse(any(diff_schema(stored, self.parsed)))
+
+    def test_changes(self):
+        """
+        Only the changed tables and columns are in the diff.
+        """
+        stored = {
+            "t1": _stored(1, "Old description.",
+                          [{"name": "id", "datatype": "int",
+                            "nullable": False},
+                           {"name": "ra", "datatype": "float",
+                            "nullable": True},
+                           {"name": "gone", "datatype": "int"}], 10),
+            "t3": _stored(3, "This is t3 table.",
+                          [{"name": "id3", "datatype": "int"}], 30),
+        }
+        diff = diff_schema(stored, self.parsed)
+        self.assertEqual(diff.insert_tables,
+                         [{"name": "t2", "description": "This is t2 table."}])
+        self.assertEqual(diff.update_tables,
+                         [{"id": 1, "description": "This is t1 table."}])
+        self.assertEqual(diff.delete_tables, [3])
+        self.assertEqual([(name, values["name"])
+                          for name, values in diff.insert_columns],
+                         [("t2", "id2")])
+        self.assertEqual([(values["id"], values["datatype"])
+                          for values in diff.update_columns],
+                         [(11, "double")])
+        self.assertEqual(sorted(diff.delete_columns), [12, 30])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,12 +29,15 @@ This is a unittest for the SchemaToMeta class.
 
 # standard library
 import logging as log
+import json
 import os
+import shutil
 import tempfile
 import unittest
 
 # local
-from lsst.dax.metaserv.schema_utils import parse_schema
+from lsst.dax.metaserv.schema_utils import parse_schema, iter_schema, \
+    parse_schema_cached, iter_schema_cached, compare_schema
 
 
 class TestS2M(unittest.TestCase):
@@ -197,6 +200,169 @@ CREATE TABLE t (
         self.assertEqual(parsed_tables["t"]["indexes"][4]["columns"], "xx, yy")
         self.assertEqual(parsed_tables["t"]["indexes"][3]["type"], "UNIQUE")
 
+    def test_iter_schema(self):
+        """
+        Test incremental parsing.
+        """
+        (fd, fName) = tempfile.mkstemp()
+        temp_file = os.fdopen(fd, "w")
+        temp_file.write("""
+CREATE TABLE t1
+(
+    id int
+) ENGINE=MyISAM;
+
+CREATE TABLE t2 (
+    id2 int,
+    s2 char
+);
+
+CREATE TABLE t3 (
+    id3 int
+""")
+        temp_file.close()
+        tables = iter_schema(fName)
+        table_name, table = next(tables)
+        self.assertEqual(table_name, "t1")
+        self.assertEqual(table["engine"], "MyISAM")
+        self.assertEqual([c["name"] for c in table["columns"]], ["id"])
+        table_name, table = next(tables)
+        self.assertEqual(table_name, "t2")
+        self.assertEqual(len(table["columns"]), 2)
+        table_name, table = next(tables)
+        self.assertEqual(table_name, "t3")
+        self.assertRaises(StopIteration, next, tables)
+        self.assertEqual(sorted(parse_schema(fName)), ["t1", "t2", "t3"])
+
+    def test_duplicate_table(self):
+        """
+        Test a table defined twice.
+        """
+        (fd, fName) = tempfile.mkstemp()
+        temp_file = os.fdopen(fd, "w")
+        temp_file.write("""
+CREATE TABLE t1 (
+    id int
+);
+
+CREATE TABLE t1 (
+    id int
+);
+""")
+        temp_file.close()
+        tables = iter_schema(fName)
+        self.assertEqual(next(tables)[0], "t1")
+        self.assertRaises(ValueError, next, tables)
+        self.assertRaises(ValueError, parse_schema, fName)
+
+    def test_missing_file(self):
+        """
+        Test missing schema file.
+        """
+        (fd, fName) = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(fName)
+        self.assertRaises(IOError, iter_schema, fName)
+        self.assertRaises(IOError, parse_schema, fName)
+
+    def test_cache(self):
+        """
+        Test cached parsing.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        (fd, fName) = tempfile.mkstemp()
+        temp_file = os.fdopen(fd, "w")
+        temp_file.write("""
+CREATE TABLE t1 (
+    id int,
+        -- <descr>the t1.id</descr>
+    v varchar(255)
+);
+""")
+        temp_file.close()
+        parsed_tables = parse_schema_cached(fName, cache_dir)
+        self.assertEqual(parsed_tables, parse_schema(fName))
+        cache_files = os.listdir(cache_dir)
+        self.assertEqual(len(cache_files), 1)
+
+        # The second call reads the cache
+        cache_path = os.path.join(cache_dir, cache_files[0])
+        with open(cache_path, "w") as cache_file:
+            json.dump({"cached": {}}, cache_file)
+        self.assertEqual(parse_schema_cached(fName, cache_dir),
+                         {"cached": {}})
+
+        # A change in the file is a cache miss
+        with open(fName, "a") as temp_file:
+            temp_file.write("CREATE TABLE t2 (id int);\n")
+        self.assertEqual(sorted(parse_schema_cached(fName, cache_dir)),
+                         ["t1", "t2"])
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_iter_cache(self):
+        """
+        Test incremental parsing through the cache.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        (fd, fName) = tempfile.mkstemp()
+        temp_file = os.fdopen(fd, "w")
+        temp_file.write("""
+CREATE TABLE t1 (
+    id int
+);
+
+CREATE TABLE t2 (
+    id2 int
+);
+""")
+        temp_file.close()
+
+        # A miss streams the tables, the cache is only written at the end
+        tables = iter_schema_cached(fName, cache_dir)
+        self.assertEqual(next(tables)[0], "t1")
+        self.assertEqual([name for name in os.listdir(cache_dir)
+                          if name.endswith(".json")], [])
+        self.assertEqual(next(tables)[0], "t2")
+        self.assertRaises(StopIteration, next, tables)
+        cache_files = os.listdir(cache_dir)
+        self.assertEqual(len(cache_files), 1)
+        self.assertTrue(cache_files[0].endswith(".json"))
+
+        # A hit yields the same tables, in order
+        self.assertEqual(list(iter_schema_cached(fName, cache_dir)),
+                         list(iter_schema(fName)))
+
+        # An abandoned iterator leaves no cache entry nor temporary file
+        with open(fName, "a") as temp_file:
+            temp_file.write("CREATE TABLE t3 (id int);\n")
+        tables = iter_schema_cached(fName, cache_dir)
+        next(tables)
+        tables.close()
+        self.assertEqual(os.listdir(cache_dir), cache_files)
+
+    def test_compare(self):
+        """
+        Test comparison with the columns of a database.
+        """
+        parsed_tables = {
+            "t1": {"columns": [{"name": "id"}, {"name": "ra"}]},
+            "t2": {"columns": [{"name": "id2"}]},
+            "t3": {"columns": [{"name": "id3"}]},
+        }
+        db_columns = {
+            "t1": ["id", "ra"],
+            "t2": ["id2", "s2"],
+            "t4": ["id4"],
+        }
+        mismatches = compare_schema(parsed_tables, db_columns)
+        self.assertEqual(sorted(kind for kind, _ in mismatches),
+                         ["COL_NOT_IN_FL", "NOT_MATCHING", "TB_NOT_IN_DB"])
+        db_columns["t2"] = ["id2"]
+        db_columns["t3"] = ["id3"]
+        self.assertEqual(compare_schema(parsed_tables, db_columns), [])
+
 
 def main():
     log.basicConfig(
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the ColumnSearchIndex class.
+"""
+
+from collections import namedtuple
+import unittest
+
+from lsst.dax.metaserv.column_store import Column, ColumnStore
+from lsst.dax.metaserv.search import ColumnSearchIndex
+
+Database = namedtuple("Database", ["id", "name", "schemas"])
+Schema = namedtuple("Schema", ["id", "name", "tables"])
+Table = namedtuple("Table", ["id", "name", "columns"])
+
+
+def make_databases():
+    store = ColumnStore()
+    store.extend([
+        Column(1, 1, "objectId", "Unique object id.", 0, "meta.id;src",
+               "", "long", False, None),
+        Column(2, 1, "ra", "RA of mean source cluster position.", 1,
+               "pos.eq.ra", "deg", "double", False, None),
+        Column(3, 1, "decl", "Dec of mean source cluster position.", 2,
+               "pos.eq.dec", "deg", "double", False, None),
+        Column(4, 1, "u_psfFlux", "Uncalibrated PSF flux.", 3,
+               "phot.count", "nmgy", "double", True, None),
+        Column(5, 2, "coord_ra", "Position in ra.", 0, "pos.eq.ra",
+               "deg", "double", True, None),
+    ])
+    tables = (Table(1, "Object", store.table_columns(1)),
+              Table(2, "Source", store.table_columns(2)))
+    return [Database(1, "S12_sdss", (Schema(1, "sdss", tables),))]
+
+
+class TestColumnSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ColumnSearchIndex(make_databases())
+
+    def names(self, *args, **kwargs):
+        return [(result.table.name, result.column.name)
+                for result in self.index.search(*args, **kwargs)]
+
+    def test_ucd(self):
+        """
+        Whole UCDs, UCD atoms and UCD prefixes match.
+        """
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.names("pos.eq.ra", fields=("ucd",)),
+                         [("Object", "ra"), ("Source", "coord_ra")])
+        self.assertEqual(self.names("pos.eq", fields=("ucd",)),
+                         [("Object", "ra"), ("Object", "decl"),
+                          ("Source", "coord_ra")])
+        self.assertEqual(self.names("pos.eq", fields=("ucd",),
+                                    prefix=False), [])
+
+    def test_terms(self):
+        """
+        All terms must match, in any field.
+        """
+        self.assertEqual(self.names("psfflux"), [("Object", "u_psfFlux")])
+        self.assertEqual(self.names("cluster dec"), [("Object", "decl")])
+        self.assertEqual(self.names("ra deg", prefix=False),
+                         [("Object", "ra"), ("Source", "coord_ra")])
+        self.assertEqual(self.names("nothing"), [])
+        self.assertEqual(self.names("  "), [])
+
+    def test_limit(self):
+        """
+        Results are limited.
+        """
+        self.assertEqual(self.names("deg", limit=1), [("Object", "ra")])
+
+
+if __name__ == "__main__":
+    unittest.main()
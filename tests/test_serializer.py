@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the precompiled serializers.
+"""
+
+from collections import namedtuple
+from itertools import islice, permutations
+import unittest
+
+from lsst.dax.metaserv.column_store import Column
+from lsst.dax.metaserv.serializer import FieldSpec, Serializer
+
+try:
+    from lsst.dax.metaserv import api_model
+    from lsst.dax.metaserv.api_model import DatabaseColumn, fast_serializer
+except ImportError:
+    DatabaseColumn = None
+
+Database = namedtuple("Database", ["id", "name", "port", "default_schema"])
+Schema = namedtuple("Schema", ["name", "tables"])
+Table = namedtuple("Table", ["name", "flag"])
+
+
+class TestSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.table = Serializer("Table", [
+            FieldSpec("name", "name", "string", None),
+            FieldSpec("flag", "flag", "boolean", None)])
+        self.schema = Serializer("Schema", [
+            FieldSpec("name", "name", "string", None),
+            FieldSpec("tables", "tables", "nested_many", self.table)])
+        self.database = Serializer("Database", [
+            FieldSpec("name", "name", "string", None),
+            FieldSpec("id", "id", "integer", None),
+            FieldSpec("url", "id", "function",
+                      lambda db: "http://host/db/%d/" % db.id),
+            FieldSpec("port", "port", "integer", None),
+            FieldSpec("default_schema", "default_schema.name", "string",
+                      None),
+            FieldSpec("schema", "default_schema", "nested", self.schema)])
+
+    def test_dump(self):
+        """
+        Values are converted and keys kept in order.
+        """
+        schema = Schema("s1", [Table("t1", 1), Table("t2", "false")])
+        result = self.database.dump(Database(3, b"db", "3306", schema))
+        self.assertEqual(list(result),
+                         ["name", "id", "url", "port", "default_schema",
+                          "schema"])
+        self.assertEqual(result["name"], "db")
+        self.assertEqual(result["url"], "http://host/db/3/")
+        self.assertEqual(result["port"], 3306)
+        self.assertEqual(result["default_schema"], "s1")
+        self.assertEqual(result["schema"]["tables"],
+                         [{"name": "t1", "flag": True},
+                          {"name": "t2", "flag": False}])
+
+    def test_missing(self):
+        """
+        None values are kept, paths through None are left out.
+        """
+        result = self.database.dump(Database(3, "db", None, None))
+        self.assertIsNone(result["port"])
+        self.assertIsNone(result["schema"])
+        self.assertNotIn("default_schema", result)
+        result = self.database.dump(Database(3, "db", None,
+                                             Schema(None, [])))
+        self.assertIsNone(result["default_schema"])
+
+    def test_invalid(self):
+        """
+        Unknown kinds and attributes are rejected at compile time.
+        """
+        with self.assertRaises(ValueError):
+            Serializer("Bad", [FieldSpec("x", "x", "float", None)])
+        with self.assertRaises(ValueError):
+            Serializer("Bad", [FieldSpec("x", "x; import os", "string",
+                                         None)])
+
+    @unittest.skipIf(DatabaseColumn is None, "marshmallow is not available")
+    def test_marshmallow(self):
+        """
+        The compiled serializer dumps the same data as marshmallow.
+        """
+        columns = [Column(1, 1, "ra", "R.A.", 0, "pos.eq.ra", "deg",
+                          "double", 1, None),
+                   Column(2, 1, "flag", "", 1, "", "", "text", None, 32)]
+        for only in (None, ("ordinal", "name"), ("name", "ordinal", "name")):
+            schema = DatabaseColumn(many=True, only=only) if only else \
+                DatabaseColumn(many=True)
+            expected = schema.dump(columns).data
+            result = fast_serializer(DatabaseColumn, only).dump_many(columns)
+            self.assertEqual(result, expected)
+            self.assertEqual([list(row) for row in result],
+                             [list(row) for row in expected])
+
+    @unittest.skipIf(DatabaseColumn is None, "marshmallow is not available")
+    def test_cache(self):
+        """
+        Serializers are cached per field selection, in bounded number.
+        """
+        self.assertIs(fast_serializer(DatabaseColumn, ("name", "name")),
+                      fast_serializer(DatabaseColumn, ("name",)))
+        selections = permutations(DatabaseColumn._declared_fields, 3)
+        for only in islice(selections, api_model.MAX_SERIALIZERS + 1):
+            fast_serializer(DatabaseColumn, only)
+        self.assertLessEqual(len(api_model._serializers),
+                             api_model.MAX_SERIALIZERS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the metadata snapshot and its generation.
+"""
+
+import unittest
+
+try:
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import OperationalError
+    from lsst.dax.metaserv import model
+    from lsst.dax.metaserv.column_store import ColumnSlice
+    from lsst.dax.metaserv.snapshot import SnapshotCache, load_snapshot
+except ImportError:
+    model = None
+
+
+class BrokenSession(object):
+    """Session of an unreachable database."""
+
+    def __init__(self):
+        self.rolled_back = False
+
+    def query(self, *args):
+        raise OperationalError("SELECT", {}, Exception("Gone away"))
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def unused_session():
+    raise AssertionError("The database was contacted")
+
+
+@unittest.skipIf(model is None, "SQLAlchemy is not available")
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        model.init_db(self.engine)
+        self.session = model.session_maker(self.engine)()
+        self.addCleanup(self.session.close)
+        database = model.MSDatabase(name="sdss")
+        self.session.add(database)
+        self.session.flush()
+        schema = model.MSDatabaseSchema(db_id=database.id, name="s1",
+                                        is_default_schema=True)
+        self.session.add(schema)
+        self.session.flush()
+        self.table = model.MSDatabaseTable(schema_id=schema.id, name="T")
+        self.session.add(self.table)
+        self.session.flush()
+        for ordinal in (1, 0):
+            self.session.add(model.MSDatabaseColumn(
+                table_id=self.table.id, name="c%d" % ordinal,
+                ordinal=ordinal, datatype="int"))
+        model.bump_generation(self.session)
+        self.session.commit()
+
+    def test_generation(self):
+        """
+        The single generation row is seeded and bumped in place.
+        """
+        self.assertEqual(model.current_generation(self.session), 1)
+        self.assertEqual(model.bump_generation(self.session), 2)
+        self.session.commit()
+        self.assertEqual(self.session.query(model.MSGeneration).count(), 1)
+
+    def test_load(self):
+        """
+        The whole tree is loaded, columns in ordinal order.
+        """
+        snapshot = load_snapshot(self.session)
+        self.assertEqual(snapshot.generation, 1)
+        database = snapshot.database("sdss")
+        self.assertIs(snapshot.database(str(database.id)), database)
+        schema = snapshot.schema(database)
+        table = snapshot.table(schema, "T")
+        self.assertEqual([column.name for column in table.columns],
+                         ["c0", "c1"])
+        # Versions only depend on the content
+        self.assertEqual(load_snapshot(self.session).database("sdss").version,
+                         database.version)
+
+    def test_versions(self):
+        """
+        Versions change with any column, and are computed without
+        building the repr of whole tables.
+        """
+        def no_repr(self):
+            raise AssertionError("Columns were materialized")
+        original = ColumnSlice.__repr__
+        ColumnSlice.__repr__ = no_repr
+        self.addCleanup(setattr, ColumnSlice, "__repr__", original)
+        snapshot = load_snapshot(self.session)
+        column = self.session.query(model.MSDatabaseColumn).filter_by(
+            name="c1").one()
+        column.unit = "deg"
+        self.session.commit()
+        reloaded = load_snapshot(self.session)
+        self.assertNotEqual(reloaded.database("sdss").version,
+                            snapshot.database("sdss").version)
+        self.assertNotEqual(reloaded.version, snapshot.version)
+
+    def test_reload(self):
+        """
+        The snapshot is reloaded once the generation is bumped.
+        """
+        cache = SnapshotCache(check_interval=0)
+        snapshot = cache.get(self.session)
+        self.assertIs(cache.get(self.session), snapshot)
+        self.table.description = "Changed."
+        model.bump_generation(self.session)
+        self.session.commit()
+        reloaded = cache.get(self.session)
+        self.assertIsNot(reloaded, snapshot)
+        self.assertEqual(reloaded.generation, 2)
+        self.assertNotEqual(reloaded.database("sdss").version,
+                            snapshot.database("sdss").version)
+
+    def test_check_interval(self):
+        """
+        The generation is not checked more than once per interval.
+        """
+        cache = SnapshotCache(check_interval=3600)
+        snapshot = cache.get(self.session)
+        model.bump_generation(self.session)
+        self.session.commit()
+        self.assertIs(cache.get(unused_session), snapshot)
+        cache.invalidate()
+        self.assertEqual(cache.get(self.session).generation, 2)
+
+    def test_unreachable(self):
+        """
+        The current snapshot is served while the database is down.
+        """
+        self.assertRaises(OperationalError, SnapshotCache().get,
+                          BrokenSession())
+        cache = SnapshotCache(check_interval=3600)
+        snapshot = cache.get(self.session)
+        cache.invalidate()
+        session = BrokenSession()
+        self.assertIs(cache.get(session), snapshot)
+        self.assertTrue(session.rolled_back)
+        # The failed check counts as a check
+        self.assertIs(cache.get(unused_session), snapshot)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the TAP_SCHEMA and VOSI tables export.
+"""
+
+from collections import namedtuple
+import unittest
+from xml.etree import ElementTree
+
+from lsst.dax.metaserv.column_store import Column
+from lsst.dax.metaserv.tap_schema import column_datatype, column_rows, \
+    iter_schemas, plan_refresh, schema_row, schema_version, table_rows, \
+    vosi_tables
+
+try:
+    from sqlalchemy import create_engine, inspect
+    from lsst.dax.metaserv import model
+    from lsst.dax.metaserv.admin_cli import _export_tap_schema
+    from lsst.dax.metaserv.snapshot import load_snapshot
+except ImportError:
+    _export_tap_schema = None
+
+Database = namedtuple("Database", ["name", "schemas"])
+Schema = namedtuple("Schema", ["name", "description", "tables", "version"])
+Table = namedtuple("Table", ["name", "description", "columns"])
+
+
+class TestTapSchema(unittest.TestCase):
+
+    def setUp(self):
+        columns = [
+            Column(1, 1, "id", "Object id.", 0, "meta.id", "", "long",
+                   False, None),
+            Column(2, 1, "ra", "R.A. <ICRS>", 1, "pos.eq.ra", "deg",
+                   "double", True, None),
+            Column(3, 1, "flag", "", 2, "", "", "text", True, 32),
+            Column(4, 1, "time", "", 3, "", "", "timestamp", True, None)]
+        self.schema = Schema("sdss", "SDSS", [
+            Table("Object", "Objects & co.", columns),
+            Table("Empty", "", [])], "v1")
+        self.other = Schema("wise", "", [], "v2")
+
+    def test_datatype(self):
+        """
+        Strings are variable-length char arrays.
+        """
+        self.assertEqual(column_datatype("text", 32), ("char", "32*", None))
+        self.assertEqual(column_datatype("text", None), ("char", "*", None))
+        self.assertEqual(column_datatype("timestamp", None),
+                         ("char", "*", "timestamp"))
+        self.assertEqual(column_datatype("int", 11), ("int", None, None))
+
+    def test_rows(self):
+        """
+        Tables are qualified by their schema.
+        """
+        self.assertEqual(schema_row(self.schema)["schema_name"], "sdss")
+        tables = list(table_rows(self.schema))
+        self.assertEqual([(row["table_name"], row["table_index"])
+                          for row in tables],
+                         [("sdss.Object", 1), ("sdss.Empty", 2)])
+        self.assertIsNone(tables[1]["description"])
+        columns = list(column_rows(self.schema))
+        self.assertEqual(len(columns), 4)
+        self.assertEqual(columns[1]["table_name"], "sdss.Object")
+        self.assertEqual(columns[1]["column_name"], "ra")
+        self.assertEqual(columns[1]["unit"], "deg")
+        self.assertEqual(columns[1]["column_index"], 2)
+        self.assertIsNone(columns[0]["unit"])
+        self.assertEqual(columns[2]["arraysize"], "32*")
+        self.assertEqual(columns[3]["xtype"], "timestamp")
+
+    def test_duplicate_schemas(self):
+        """
+        TAP schema names must be unique across databases.
+        """
+        databases = [Database("a", [self.schema]),
+                     Database("b", [self.schema._replace(version="v3")])]
+        with self.assertRaises(ValueError):
+            list(iter_schemas(databases))
+
+    def test_plan_refresh(self):
+        """
+        Only changed schemas are rewritten.
+        """
+        schemas = [self.schema, self.other]
+        stale, removed = plan_refresh(schemas, {})
+        self.assertEqual(stale, schemas)
+        self.assertEqual(removed, [])
+
+        exported = {"sdss": schema_version(self.schema),
+                    "wise": "old", "gone": "old"}
+        stale, removed = plan_refresh(schemas, exported)
+        self.assertEqual(stale, [self.other])
+        self.assertEqual(removed, ["gone"])
+
+        stale, removed = plan_refresh(schemas, exported, full=True)
+        self.assertEqual(stale, schemas)
+
+    def test_vosi_tables(self):
+        """
+        The VOSI tableset is well-formed and escaped.
+        """
+        chunks = list(vosi_tables([self.schema, self.other]))
+        # Header, 2 schemas, 2 tables and footer
+        self.assertEqual(len(chunks), 8)
+        root = ElementTree.fromstring("".join(chunks).encode("utf-8"))
+        schemas = root.findall("schema")
+        self.assertEqual([schema.findtext("name") for schema in schemas],
+                         ["sdss", "wise"])
+        table = schemas[0].find("table")
+        self.assertEqual(table.findtext("name"), "sdss.Object")
+        self.assertEqual(table.findtext("description"), "Objects & co.")
+        columns = table.findall("column")
+        self.assertEqual(columns[1].findtext("description"), "R.A. <ICRS>")
+        self.assertEqual(columns[1].findtext("flag"), "nullable")
+        self.assertIsNone(columns[0].find("flag"))
+        self.assertEqual(columns[2].find("dataType").get("arraysize"),
+                         "32*")
+
+
+@unittest.skipIf(_export_tap_schema is None,
+                 "SQLAlchemy or lsst.db is not available")
+class TestTapSchemaExport(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.tap_engine = create_engine("sqlite://")
+        model.init_db(self.engine)
+        self.session = model.session_maker(self.engine)()
+        self.addCleanup(self.session.close)
+        database = model.MSDatabase(name="sdss")
+        self.session.add(database)
+        self.session.flush()
+        for name in ("s1", "s2"):
+            schema = model.MSDatabaseSchema(db_id=database.id, name=name,
+                                            is_default_schema=name == "s1")
+            self.session.add(schema)
+            self.session.flush()
+            table = model.MSDatabaseTable(schema_id=schema.id, name="T")
+            self.session.add(table)
+            self.session.flush()
+            self.session.add(model.MSDatabaseColumn(
+                table_id=table.id, name="c", ordinal=0, datatype="text",
+                arraysize=8, nullable=True))
+        model.bump_generation(self.session)
+        self.session.commit()
+
+    def export(self, full=False):
+        stale, removed = _export_tap_schema(
+            self.session, load_snapshot(self.session), self.tap_engine,
+            None, full)
+        return [schema.name for schema in stale], removed
+
+    def test_refresh(self):
+        """
+        Only the changed schemas are written again.
+        """
+        self.assertEqual(self.export(), (["s1", "s2"], []))
+        self.assertEqual(self.export(), ([], []))
+        self.assertEqual(self.export(full=True), (["s1", "s2"], []))
+        rows = self.tap_engine.execute(
+            "SELECT table_name, column_name, arraysize FROM columns "
+            "ORDER BY table_name").fetchall()
+        self.assertEqual([tuple(row) for row in rows],
+                         [("s1.T", "c", "8*"), ("s2.T", "c", "8*")])
+
+        column = self.session.query(model.MSDatabaseColumn).join(
+            model.MSDatabaseTable).join(model.MSDatabaseSchema).filter(
+            model.MSDatabaseSchema.name == "s2").one()
+        column.description = "Changed."
+        model.bump_generation(self.session)
+        self.session.commit()
+        self.assertEqual(self.export(), (["s2"], []))
+        self.assertEqual(self.tap_engine.execute(
+            "SELECT description FROM columns WHERE table_name = 's2.T'"
+        ).scalar(), "Changed.")
+
+        table_id = column.table_id
+        self.session.query(model.MSDatabaseColumn).filter(
+            model.MSDatabaseColumn.id == column.id).delete()
+        self.session.query(model.MSDatabaseTable).filter(
+            model.MSDatabaseTable.id == table_id).delete()
+        self.session.query(model.MSDatabaseSchema).filter(
+            model.MSDatabaseSchema.name == "s2").delete()
+        model.bump_generation(self.session)
+        self.session.commit()
+        self.assertEqual(self.export(), ([], ["s2"]))
+        self.assertEqual(self.tap_engine.execute(
+            "SELECT schema_name FROM tables").fetchall(), [("s1",)])
+
+        # The export bookkeeping stays in the metaserv database
+        self.assertEqual(sorted(inspect(self.tap_engine).get_table_names()),
+                         ["columns", "key_columns", "keys", "schemas",
+                          "tables"])
+        self.assertEqual(
+            [row.schema_name for row in self.session.query(
+                model.MSTapExport.schema_name)], ["s1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# This file is part of dax_metaserv.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is a unittest for the URL templates.
+"""
+
+import unittest
+
+from lsst.dax.metaserv.urls import ID_MARKER, UrlTemplateCache, UrlTemplates
+
+try:
+    from flask import Flask, url_for
+except ImportError:
+    Flask = None
+
+
+class TestUrlTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def build(endpoint, **values):
+            self.calls.append(endpoint)
+            query = "".join("?%s=%s" % (name, value)
+                            for name, value in sorted(values.items())
+                            if name != "table_id" and value is not None)
+            return "http://host/%s/%s/%s" % (endpoint, values["table_id"],
+                                             query)
+        self.build = build
+
+    def test_template(self):
+        """
+        URLs are built once per endpoint and fixed values.
+        """
+        templates = UrlTemplates(self.build)
+        for table_id in (1, 2, 30):
+            self.assertEqual(templates.url("table", "table_id", table_id,
+                                           db_id=1),
+                             "http://host/table/%d/?db_id=1" % table_id)
+        self.assertEqual(templates.url("table", "table_id", 4, db_id=2),
+                         "http://host/table/4/?db_id=2")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_fallback(self):
+        """
+        Non-integer ids and markers in values are built every time.
+        """
+        templates = UrlTemplates(self.build)
+        self.assertEqual(templates.url("table", "table_id", "Object"),
+                         "http://host/table/Object/")
+        self.assertEqual(templates.url("table", "table_id", 1,
+                                       db_id=ID_MARKER),
+                         "http://host/table/1/?db_id=%s" % ID_MARKER)
+        templates.url("table", "table_id", 2, db_id=ID_MARKER)
+        self.assertEqual(len(self.calls), 4)
+
+    def test_max_templates(self):
+        """
+        Templates are dropped once there are too many of them.
+        """
+        templates = UrlTemplates(self.build, max_templates=2)
+        for schema_id in ("1", "01", "001", "1"):
+            self.assertEqual(templates.url("table", "table_id", 3,
+                                           schema_id=schema_id),
+                             "http://host/table/3/?schema_id=%s" % schema_id)
+        self.assertEqual(len(self.calls), 4)
+        templates.url("table", "table_id", 4, schema_id="1")
+        self.assertEqual(len(self.calls), 4)
+        self.assertLessEqual(len(templates._templates), 2)
+
+    def test_cache(self):
+        """
+        Templates are kept per URL root, up to a limit.
+        """
+        cache = UrlTemplateCache(self.build, max_roots=2)
+        first = cache.get("http://a/")
+        self.assertIs(cache.get("http://a/"), first)
+        cache.get("http://b/")
+        cache.get("http://c/")
+        self.assertIsNot(cache.get("http://a/"), first)
+
+    @unittest.skipIf(Flask is None, "Flask is not available")
+    def test_url_for(self):
+        """
+        Templates give the same URLs as url_for.
+        """
+        app = Flask(__name__)
+        app.add_url_rule("/db/<string:db_id>/tables/<table_id>/", "table")
+        app.add_url_rule("/db/<string:db_id>/<string:schema_id>/tables/"
+                         "<table_id>/", "table")
+
+        def build(endpoint, **values):
+            return url_for(endpoint, _external=True, **values)
+        for base_url in ("http://localhost/", "https://example.org/api/"):
+            templates = UrlTemplates(build)
+            with app.test_request_context("/", base_url=base_url):
+                for values in (dict(db_id=1), dict(db_id="S12 sdss"),
+                               dict(db_id=1, schema_id=2),
+                               dict(db_id=1, schema_id="a/b")):
+                    for table_id in (1, 42, "Object"):
+                        self.assertEqual(
+                            templates.url("table", "table_id", table_id,
+                                          **values),
+                            url_for("table", table_id=table_id,
+                                    _external=True, **values))
+
+
+if __name__ == "__main__":
+    unittest.main()